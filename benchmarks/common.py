@@ -0,0 +1,23 @@
+"""Utilidades compartidas por los scripts de benchmarks/."""
+import os
+import math
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[rank - 1]
+
+
+def git_revision():
+    """Revisión de git con la que se midió, para poder comparar resultados"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,332 @@
+"""Prueba de carga HTTP del servidor de microscopios.
+
+Arranca server/server.py con cámaras sintéticas y hardware simulado, lanza
+clientes concurrentes según una mezcla de peticiones y guarda el rendimiento
+y las latencias p50/p95/p99 por endpoint en JSON.
+
+Ejemplos:
+    python benchmarks/http_load.py --mix ui --clients 8 --duration 30
+    python benchmarks/http_load.py --mix client --clients 4 --speedup 10
+    python benchmarks/http_load.py --mix capture --output actual.json --compare base.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+import requests
+
+from common import ROOT, percentile, git_revision
+
+SERVER_SCRIPT = os.path.join(ROOT, 'server', 'server.py')
+
+# Cada tarea: (endpoint, método, periodo en segundos; 0 = bucle cerrado, constructor de la petición)
+# El método STREAM abre una conexión continua que se lee hasta el final de la medición.
+# La mezcla 'ui' reproduce el sondeo de las pantallas PyQt anterior al canal de eventos;
+# 'client' reproduce el cliente actual: /events, la transmisión de la pestaña visible y
+# la revalidación de respaldo de /state con If-None-Match (FALLBACK_POLL_MS = 30 s).
+MIXES = {
+    'client': [
+        ('/events', 'STREAM', 0, lambda mid: ('/events', None)),                  # EventSubscriber
+        ('/stream/<id>', 'STREAM', 0, lambda mid: (f'/stream/{mid}', None)),      # StreamThread
+        ('/state', 'GET', 30.0, lambda mid: ('/state', None)),                    # APIClient.get_state
+        ('/capture_image/<id>', 'GET', 10.0, lambda mid: (f'/capture_image/{mid}', None)),
+    ],
+    'ui': [
+        ('/get_config', 'GET', 2.0, lambda mid: ('/get_config', None)),          # SystemStatusScreen
+        ('/list_microscopes', 'GET', 2.0, lambda mid: ('/list_microscopes', None)),
+        ('/get_config', 'GET', 3.0, lambda mid: ('/get_config', None)),          # MicroscopesScreen
+        ('/microscope_config/<id>', 'GET', 2.0, lambda mid: (f'/microscope_config/{mid}', None)),  # MicroscopeThread
+        ('/get_data', 'GET', 5.0, lambda mid: ('/get_data', None)),              # CalibrationScreen
+        ('/capture_image/<id>', 'GET', 10.0, lambda mid: (f'/capture_image/{mid}', None)),
+    ],
+    'capture': [
+        ('/capture_image/<id>', 'GET', 0, lambda mid: (f'/capture_image/{mid}', None)),
+    ],
+    'control': [
+        ('/set_intensity', 'POST', 0, lambda mid: ('/set_intensity', {
+            'microscope_id': mid, 'intensity': random.randint(0, 100)})),
+        ('/get_config', 'GET', 0, lambda mid: ('/get_config', None)),
+    ],
+    'mixed': [
+        ('/get_config', 'GET', 0, lambda mid: ('/get_config', None)),
+        ('/get_data', 'GET', 0, lambda mid: ('/get_data', None)),
+        ('/capture_image/<id>', 'GET', 0, lambda mid: (f'/capture_image/{mid}', None)),
+        ('/set_intensity', 'POST', 0, lambda mid: ('/set_intensity', {
+            'microscope_id': mid, 'intensity': random.randint(0, 100)})),
+    ],
+}
+
+
+class Recorder:
+    """Acumula latencias y errores por endpoint desde varios hilos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.stream_bytes = defaultdict(int)
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def record_bytes(self, endpoint, count):
+        with self.lock:
+            self.stream_bytes[endpoint] += count
+
+    def summary(self, duration):
+        results = {}
+        with self.lock:
+            for endpoint, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                results[endpoint] = {
+                    'count': len(values),
+                    'errors': self.errors[endpoint],
+                    'throughput': len(values) / duration,
+                    'mean_ms': 1000 * sum(values) / len(values),
+                    'p50_ms': 1000 * percentile(values, 0.50),
+                    'p95_ms': 1000 * percentile(values, 0.95),
+                    'p99_ms': 1000 * percentile(values, 0.99),
+                    'max_ms': 1000 * values[-1]
+                }
+                if endpoint in self.stream_bytes:
+                    # Transmisiones: la latencia es hasta las cabeceras; el caudal se mide aparte
+                    results[endpoint]['bytes_per_s'] = self.stream_bytes[endpoint] / duration
+        return results
+
+
+def response_ok(path, response):
+    """El servidor responde 200 también a los fallos: se revisa 'success' y el tipo de imagen"""
+    if response.status_code == 304:
+        return True  # revalidación condicional (If-None-Match) sin cambios
+    if response.status_code != 200:
+        return False
+    content_type = response.headers.get('Content-Type', '')
+    if path.startswith('/capture_image/'):
+        return content_type.startswith('image/')
+    if content_type.startswith('application/json'):
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        return not (isinstance(body, dict) and body.get('success') is False)
+    return True
+
+
+def run_stream(base_url, endpoint, path, deadline, recorder, responses):
+    """Una conexión continua (/events, /stream): latencia hasta las cabeceras y bytes leídos.
+
+    Como el cliente, reconecta si el servidor la cierra antes del final.
+    """
+    session = requests.Session()  # una por hilo, como EventSubscriber y StreamThread
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(base_url + path, stream=True, timeout=(10, 60))
+            responses.append(response)
+            recorder.record(endpoint, time.perf_counter() - start, response.status_code == 200)
+            if response.status_code != 200:
+                response.close()
+                time.sleep(1.0)
+                continue
+            for chunk in response.iter_content(chunk_size=16384):
+                recorder.record_bytes(endpoint, len(chunk))
+                if time.monotonic() >= deadline:
+                    break
+            response.close()
+        except (requests.exceptions.RequestException, AttributeError, ValueError):
+            # Al terminar, main() cierra las respuestas abiertas: la lectura falla y se sale
+            if time.monotonic() < deadline:
+                recorder.record(endpoint, time.perf_counter() - start, False)
+                time.sleep(1.0)
+    session.close()
+
+
+def run_client(base_url, mix, microscopes, speedup, deadline, recorder, responses):
+    """Un cliente: conexiones continuas y tareas periódicas (como los QTimer) o en bucle cerrado"""
+    session = requests.Session()
+    rng = random.Random()
+    for endpoint, method, _, build in mix:
+        if method == 'STREAM':
+            # Hilo aparte, como EventSubscriber/StreamThread; main() cierra su respuesta al final
+            path, _ = build(rng.choice(microscopes))
+            threading.Thread(target=run_stream, daemon=True,
+                             args=(base_url, endpoint, path, deadline, recorder, responses)).start()
+    mix = [task for task in mix if task[1] != 'STREAM']
+    etags = {}  # path -> ETag, para las peticiones condicionales como las de APIClient.get_state
+    now = time.monotonic()
+    # Desfase aleatorio para que los clientes no sondeen todos a la vez
+    schedule = [now + rng.uniform(0, period / speedup) if period else now for _, _, period, _ in mix]
+
+    while mix:
+        index = min(range(len(mix)), key=schedule.__getitem__)
+        wait = schedule[index] - time.monotonic()
+        if schedule[index] >= deadline:
+            break
+        if wait > 0:
+            time.sleep(wait)
+
+        endpoint, method, period, build = mix[index]
+        path, body = build(rng.choice(microscopes))
+        start = time.perf_counter()
+        try:
+            if method == 'GET':
+                headers = {'If-None-Match': etags[path]} if path in etags else {}
+                response = session.get(base_url + path, headers=headers, timeout=10)
+                if 'ETag' in response.headers:
+                    etags[path] = response.headers['ETag']
+            else:
+                response = session.post(base_url + path, json=body, timeout=10)
+            latency = time.perf_counter() - start
+            ok = response_ok(path, response)
+        except requests.exceptions.RequestException:
+            latency = time.perf_counter() - start
+            ok = False
+        recorder.record(endpoint, latency, ok)
+
+        schedule[index] = schedule[index] + period / speedup if period else time.monotonic()
+
+
+def start_server(port, cameras, extra_env):
+    """Arranca el servidor en un directorio temporal con hardware simulado"""
+    workdir = tempfile.mkdtemp(prefix='microscope_bench_')
+    env = dict(os.environ)
+    env.update({
+        'CAMERA_SOURCE': 'synthetic',
+        'SYNTHETIC_CAMERAS': str(cameras),
+        'HARDWARE_BACKEND': 'sim',
+        'SERVER_HOST': '127.0.0.1',
+        'SERVER_PORT': str(port),
+    })
+    env.update(extra_env)
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen([sys.executable, SERVER_SCRIPT], cwd=workdir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, workdir
+
+
+def wait_ready(base_url, cameras, timeout=60):
+    """Espera a que el servidor responda y todas las cámaras den frames"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            microscopes = requests.get(f"{base_url}/list_microscopes", timeout=2).json()['microscopes']
+            ids = [m['id'] for m in microscopes]
+            if len(ids) >= cameras and all(
+                    response_ok(f"/capture_image/{mid}",
+                                requests.get(f"{base_url}/capture_image/{mid}", timeout=10))
+                    for mid in ids):
+                return ids
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("El servidor no estuvo listo a tiempo")
+
+
+def compare(results, baseline, max_regression):
+    """Compara p95 por endpoint; devuelve la lista de regresiones"""
+    regressions = []
+    print(f"\n{'endpoint':<28}{'p95 base':>12}{'p95 actual':>12}{'cambio':>10}")
+    for endpoint, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(endpoint)
+        if not previous:
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        print(f"{endpoint:<28}{previous['p95_ms']:>12.2f}{current['p95_ms']:>12.2f}{change:>+10.1%}")
+        if change > max_regression:
+            regressions.append(endpoint)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', choices=sorted(MIXES), default='ui')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20.0, help='segundos de medición')
+    parser.add_argument('--cameras', type=int, default=2, help='microscopios sintéticos')
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help='factor de aceleración de los periodos de sondeo de la mezcla')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='usar un servidor ya en marcha en lugar de arrancar uno')
+    parser.add_argument('--server-env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='variables de entorno adicionales para el servidor')
+    parser.add_argument('--output', help='archivo JSON de resultados')
+    parser.add_argument('--compare', help='resultados JSON de referencia')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='aumento máximo tolerado del p95 (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        extra_env = dict(item.split('=', 1) for item in args.server_env)
+        process, workdir = start_server(args.port, args.cameras, extra_env)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Servidor de prueba en {base_url} (directorio {workdir})")
+
+    try:
+        microscopes = wait_ready(base_url, args.cameras)
+        recorder = Recorder()
+        responses = []  # conexiones continuas abiertas, para cerrarlas al terminar
+        deadline = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=run_client,
+                             args=(base_url, MIXES[args.mix], microscopes, args.speedup, deadline, recorder,
+                                   responses))
+            for _ in range(args.clients)
+        ]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+        for response in responses:
+            response.close()  # /events puede tardar hasta el siguiente keep-alive en enviar algo
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'mix': args.mix,
+            'clients': args.clients,
+            'cameras': args.cameras,
+            'duration': elapsed,
+            'speedup': args.speedup,
+        },
+        'endpoints': recorder.summary(elapsed)
+    }
+
+    print(f"\n{'endpoint':<28}{'n':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, stats in results['endpoints'].items():
+        print(f"{endpoint:<28}{stats['count']:>7}{stats['errors']:>5}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\nRegresión de p95 en: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Coste de CPU y fluctuación del PWM de los LED según el driver.
+
+Para cada driver crea un canal PWM por LED con el ciclo de trabajo indicado y
+mide durante --duration segundos el tiempo de CPU consumido por este proceso
+(y por pigpiod, si está en marcha). Después, en una segunda fase, registra
+los flancos de cada canal y calcula la fluctuación del periodo y del tiempo
+en alto. La captura de flancos tiene su propio coste, por eso no se mezcla
+con la medición de CPU.
+
+Drivers:
+    soft      RPi.GPIO (un hilo por canal)            requiere Raspberry Pi
+    pigpio    PWM por hardware/DMA de pigpiod         requiere pigpiod
+    sim-soft  emulación del PWM por software          en cualquier equipo
+    sim       PWM simulado sin hilos (referencia)     en cualquier equipo
+
+En la Raspberry Pi los flancos se capturan con callbacks de pigpio si pigpiod
+está en marcha; sin él la fluctuación de soft/pigpio queda sin medir.
+
+Ejemplos:
+    python benchmarks/led_backends.py --drivers sim,sim-soft --channels 4
+    sudo pigpiod && python benchmarks/led_backends.py --drivers soft,pigpio --output leds.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import defaultdict
+
+from common import ROOT, percentile, git_revision
+
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+from hardwareBackend import RPiBackend, SimulatorBackend  # noqa: E402
+from ledDriver import LED_PINS  # noqa: E402
+
+DRIVERS = ['soft', 'pigpio', 'sim-soft', 'sim']
+
+
+def create_backend(driver):
+    if driver in ('soft', 'pigpio'):
+        return RPiBackend(pwm_driver=driver)
+    return SimulatorBackend(threaded_pwm=driver == 'sim-soft')
+
+
+def pigpiod_pid():
+    """PID de pigpiod, para sumar su CPU a la del driver pigpio"""
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/comm') as f:
+                if f.read().strip() == 'pigpiod':
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+def process_cpu_seconds(pid):
+    """utime + stime de un proceso según /proc/<pid>/stat"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+class EdgeRecorder:
+    """Flancos (segundos, nivel) por pin: de pigpio si está disponible, si no del PWM simulado"""
+
+    def __init__(self, backend, pins):
+        self.backend = backend
+        self.pins = pins
+        self.pi = None
+        self.callbacks = []
+        self.edges = defaultdict(list)
+
+    def start(self):
+        if isinstance(self.backend, SimulatorBackend):
+            for pin in self.pins:
+                edges = getattr(self.backend.pwms[pin], 'edges', None)
+                if edges is not None:
+                    edges.clear()
+            return True
+        try:
+            import pigpio
+        except ImportError:
+            return False
+        self.pi = self.backend.pi or pigpio.pi()
+        if not self.pi.connected:
+            self.pi = None
+            return False
+        for pin in self.pins:
+            # tick en microsegundos del reloj de pigpiod (se desborda cada ~72 minutos)
+            self.callbacks.append(self.pi.callback(
+                pin, pigpio.EITHER_EDGE,
+                lambda gpio, level, tick: self.edges[gpio].append((tick / 1e6, level))))
+        return True
+
+    def stop(self):
+        for callback in self.callbacks:
+            callback.cancel()
+        if self.pi is not None and self.pi is not self.backend.pi:
+            self.pi.stop()
+        if isinstance(self.backend, SimulatorBackend):
+            for pin in self.pins:
+                self.edges[pin] = list(getattr(self.backend.pwms[pin], 'edges', []))
+
+
+def edge_stats(edges, frequency, duty):
+    """Fluctuación del periodo (entre flancos de subida) y del tiempo en alto"""
+    periods = []
+    highs = []
+    last_rise = None
+    for (t, level), (next_t, next_level) in zip(edges, edges[1:]):
+        if level == 1:
+            if last_rise is not None and 0 < t - last_rise < 10 / frequency:
+                periods.append(t - last_rise)
+            last_rise = t
+            if next_level == 0:
+                highs.append(next_t - t)
+    if len(periods) < 2 or not highs:
+        return {'edges': len(edges), 'cycles': len(periods)}
+
+    period = 1.0 / frequency
+    deviations = sorted(abs(p - period) for p in periods)
+    duty_values = [h / period * 100 for h in highs]
+    return {
+        'edges': len(edges),
+        'cycles': len(periods),
+        'frequency': 1.0 / statistics.mean(periods),
+        'period_jitter_us': 1e6 * statistics.pstdev(periods),
+        'period_p99_error_us': 1e6 * percentile(deviations, 0.99),
+        'high_jitter_us': 1e6 * statistics.pstdev(highs),
+        'duty_mean': statistics.mean(duty_values),
+        'duty_error': statistics.mean(duty_values) - duty
+    }
+
+
+def run_driver(driver, pins, frequency, duty, duration):
+    try:
+        backend = create_backend(driver)
+    except (ImportError, RuntimeError, ValueError) as e:
+        return {'error': str(e)}
+
+    try:
+        pwms = {}
+        for pin in pins:
+            backend.setup_output(pin)
+            pwms[pin] = backend.pwm(pin, frequency)
+            pwms[pin].start(duty)
+        time.sleep(0.5)  # estabilizar antes de medir
+
+        # Fase 1: CPU sin captura de flancos
+        daemon = pigpiod_pid() if driver == 'pigpio' else None
+        daemon_start = process_cpu_seconds(daemon) if daemon else None
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        time.sleep(duration)
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        daemon_cpu = process_cpu_seconds(daemon) - daemon_start if daemon_start is not None else None
+        total_cpu = cpu + (daemon_cpu or 0.0)
+
+        result = {
+            'channels': len(pins),
+            'cpu_percent': 100 * cpu / wall,
+            'daemon_cpu_percent': 100 * daemon_cpu / wall if daemon_cpu is not None else None,
+            'cpu_percent_per_channel': 100 * total_cpu / wall / len(pins)
+        }
+
+        # Fase 2: fluctuación por canal
+        recorder = EdgeRecorder(backend, pins)
+        if recorder.start():
+            time.sleep(duration)
+            recorder.stop()
+            result['jitter'] = {pin: edge_stats(recorder.edges[pin], frequency, duty) for pin in pins}
+        else:
+            result['jitter'] = None
+    finally:
+        backend.cleanup()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drivers', default='sim,sim-soft',
+                        help=f"drivers separados por comas ({', '.join(DRIVERS)})")
+    parser.add_argument('--channels', type=int, default=len(LED_PINS), help='LED simultáneos')
+    parser.add_argument('--pins', help='pines BCM separados por comas (por defecto LED_PINS)')
+    parser.add_argument('--frequency', type=float, default=100.0, help='Hz, como los controladores')
+    parser.add_argument('--duty', type=float, default=50.0, help='ciclo de trabajo en %%')
+    parser.add_argument('--duration', type=float, default=10.0, help='segundos por fase de medición')
+    parser.add_argument('--output', help='archivo JSON de resultados')
+    args = parser.parse_args()
+
+    drivers = [d.strip() for d in args.drivers.split(',') if d.strip()]
+    unknown = [d for d in drivers if d not in DRIVERS]
+    if unknown:
+        parser.error(f"Drivers desconocidos: {', '.join(unknown)}")
+    pins = [int(p) for p in args.pins.split(',')] if args.pins else LED_PINS
+    if args.channels > len(pins):
+        parser.error(f"Solo hay {len(pins)} pines; indique más con --pins")
+    pins = pins[:args.channels]
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'pins': pins,
+            'frequency': args.frequency,
+            'duty': args.duty,
+            'duration': args.duration
+        },
+        'drivers': {}
+    }
+    for driver in drivers:
+        print(f"Midiendo {driver} con {len(pins)} canales...")
+        results['drivers'][driver] = run_driver(driver, pins, args.frequency, args.duty, args.duration)
+
+    print(f"\n{'driver':<10}{'CPU %':>8}{'CPU %/canal':>13}{'fluct. periodo us':>19}{'fluct. alto us':>16}"
+          f"{'error ciclo %':>15}")
+    for driver, stats in results['drivers'].items():
+        if 'error' in stats:
+            print(f"{driver:<10}  no disponible: {stats['error']}")
+            continue
+        measured = [s for s in (stats['jitter'] or {}).values() if 'period_jitter_us' in s]
+        if measured:
+            period_jitter = f"{max(s['period_jitter_us'] for s in measured):>19.1f}"
+            high_jitter = f"{max(s['high_jitter_us'] for s in measured):>16.1f}"
+            duty_error = f"{max((s['duty_error'] for s in measured), key=abs):>+15.2f}"
+        else:
+            period_jitter, high_jitter, duty_error = f"{'-':>19}", f"{'-':>16}", f"{'-':>15}"
+        print(f"{driver:<10}{stats['cpu_percent']:>8.2f}{stats['cpu_percent_per_channel']:>13.2f}"
+              f"{period_jitter}{high_jitter}{duty_error}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Prueba de humo del servidor de microscopios.
+
+Arranca server/server.py con cámaras sintéticas y hardware simulado (como
+http_load.py) y recorre una vez las rutas que no cubren las mezclas de carga,
+cada una con un tiempo límite: un bloqueo cuenta como fallo. Después de
+/capture_all comprueba que cada cámara sigue dando frames nuevos, es decir,
+que no quedó ningún lock de cámara tomado.
+
+Ejemplos:
+    python benchmarks/smoke.py
+    python benchmarks/smoke.py --cameras 4 --server-env SERVER_MODE=async
+"""
+import io
+import sys
+import json
+import zipfile
+import argparse
+
+import requests
+
+from http_load import start_server, wait_ready, response_ok
+
+TIMEOUT = 15  # segundos por petición
+
+
+def check_capture_all(base_url, microscopes):
+    """El ZIP trae una imagen por microscopio y el manifiesto no registra fallos"""
+    response = requests.get(f"{base_url}/capture_all", timeout=TIMEOUT)
+    if response.headers.get('Content-Type') != 'application/zip':
+        return f"respuesta inesperada: {response.status_code} {response.text[:200]}"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        manifest = json.loads(zf.read('manifest.json'))
+        images = [name for name in zf.namelist() if name.endswith('.jpg')]
+    if manifest['failed'] or sorted(manifest['captured']) != sorted(microscopes):
+        return f"capturados {manifest['captured']}, fallidos {manifest['failed']}"
+    if len(images) != len(microscopes):
+        return f"{len(images)} imágenes para {len(microscopes)} microscopios"
+    return None
+
+
+def check_fresh_frames(base_url, microscopes):
+    """Cada cámara entrega un frame nuevo: su hilo de captura no está bloqueado"""
+    for mid in microscopes:
+        path = f"/capture_image/{mid}"
+        response = requests.get(f"{base_url}{path}?fresh=1", timeout=TIMEOUT)
+        if not response_ok(path, response):
+            return f"{mid} no entrega frames nuevos ({response.status_code})"
+    return None
+
+
+def check_timelapse(base_url, microscopes):
+    """Una intensidad fuera de rango se rechaza sin afectar a los LED"""
+    response = requests.post(f"{base_url}/timelapse/start", timeout=TIMEOUT, json={
+        'microscope_id': microscopes[0], 'interval': 1, 'max_captures': 1, 'led_intensity': 150})
+    if response.status_code != 400:
+        return f"led_intensity=150 devolvió {response.status_code}"
+    response = requests.post(f"{base_url}/set_intensity", timeout=TIMEOUT,
+                             json={'microscope_id': microscopes[0], 'intensity': 50})
+    if not response_ok('/set_intensity', response):
+        return f"/set_intensity falla después: {response.status_code} {response.text[:200]}"
+    return None
+
+
+CHECKS = [
+    ('/capture_all', check_capture_all),
+    ('/capture_image?fresh=1 tras /capture_all', check_fresh_frames),
+    ('/capture_all repetido', check_capture_all),
+    ('/timelapse/start con intensidad fuera de rango', check_timelapse),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cameras', type=int, default=2, help='microscopios sintéticos')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--url', help='usar un servidor ya en marcha en lugar de arrancar uno')
+    parser.add_argument('--server-env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='variables de entorno adicionales para el servidor')
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        extra_env = dict(item.split('=', 1) for item in args.server_env)
+        process, workdir = start_server(args.port, args.cameras, extra_env)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Servidor de prueba en {base_url} (directorio {workdir})")
+
+    failures = 0
+    try:
+        microscopes = wait_ready(base_url, args.cameras)
+        for name, check in CHECKS:
+            try:
+                error = check(base_url, microscopes)
+            except requests.exceptions.Timeout:
+                error = f"sin respuesta en {TIMEOUT} s (¿bloqueo?)"
+            except (requests.exceptions.RequestException, ValueError, KeyError, zipfile.BadZipFile) as e:
+                error = str(e)
+            print(f"{'FALLO' if error else 'OK':<7}{name}" + (f": {error}" if error else ""))
+            failures += error is not None
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
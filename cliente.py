@@ -19,6 +19,9 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Error", "No se pudo conectar al servidor")
             sys.exit(1)
         
+        # Canal de eventos del servidor (antes de crear las pantallas, que se suscriben a él)
+        self.api_client.start_events()
+        
         # Configurar pantallas
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
@@ -59,6 +62,12 @@ class MainWindow(QMainWindow):
             if microscopes:
                 self.microscopes_screen.load_data(microscopes)
     
+    def closeEvent(self, event):
+        """Detiene los hilos de los microscopios, envía los ajustes pendientes y cierra el canal de eventos"""
+        self.microscopes_screen.stop_threads()
+        self.api_client.close()
+        super().closeEvent(event)
+    
     def show_microscopes(self):
         """Muestra la pantalla de microscopios y actualiza datos"""
         self.microscopes_screen.refresh_data()
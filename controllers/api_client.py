@@ -2,6 +2,10 @@ import requests
 from PyQt6.QtCore import QObject, pyqtSignal
 from datetime import datetime
 import os
+import time
+import threading
+from controllers.event_subscriber import EventSubscriber, FALLBACK_POLL_MS
+from controllers.command_channel import CommandChannel
 
 class APIClient(QObject):
     connection_changed = pyqtSignal(bool)
@@ -12,65 +16,171 @@ class APIClient(QObject):
         self.session = requests.Session()
         self.timeout = 5
         
-    def get_system_status(self):
-        try:
-            response = self.session.get(f"{self.base_url}/get_config", timeout=self.timeout)
+        # Copia local de /state compartida por todas las pantallas e hilos
+        self.state = None
+        self.state_etag = None
+        self.state_time = 0.0
+        self.state_max_age = 1.0  # segundos antes de volver a consultar al servidor
+        self.state_lock = threading.Lock()
+        
+        # Canal de eventos del servidor (None hasta llamar a start_events)
+        self.events = None
+        # Envío agrupado de ajustes en segundo plano (se crea al primer uso)
+        self.commands = None
+
+    def start_events(self):
+        """Inicia la suscripción a /events; las pantallas se conectan a sus señales"""
+        if self.events is None:
+            self.events = EventSubscriber(self)
+            # Los eventos se aplican a la copia local; solo se vuelve a pedir /state si
+            # cambian los microscopios o el servidor pide resincronizar
+            self.events.event_received.connect(self.apply_event)
+            self.events.resync_required.connect(self.invalidate_state)
+            self.events.connection_changed.connect(self.connection_changed.emit)
+            self.events.start()
+        return self.events
+    
+    def stop_events(self):
+        if self.events is not None:
+            self.events.stop()
+            self.events = None
+    
+    def events_connected(self):
+        return self.events is not None and self.events.connected
+    
+    def get_command_channel(self):
+        if self.commands is None:
+            self.commands = CommandChannel(self)
+            self.commands.start()
+        return self.commands
+    
+    def send_command(self, microscope_id, setting, value):
+        """Envía un ajuste sin bloquear; los valores seguidos se agrupan y solo cuenta el último"""
+        self.get_command_channel().submit(microscope_id, setting, value)
+    
+    def close(self):
+        """Envía los ajustes pendientes y detiene los hilos en segundo plano"""
+        if self.commands is not None:
+            self.commands.stop()
+            self.commands = None
+        self.stop_events()
+
+    def get_state(self):
+        """Estado agregado del servidor; si no cambió, el servidor responde 304 sin cuerpo"""
+        # Con el canal de eventos la copia local se mantiene al día y solo se revalida de respaldo
+        max_age = FALLBACK_POLL_MS / 1000 if self.events_connected() else self.state_max_age
+        with self.state_lock:
+            if self.state is not None and time.monotonic() - self.state_time < max_age:
+                return self.state
+            headers = {'If-None-Match': self.state_etag} if self.state_etag else {}
+            try:
+                response = self.session.get(f"{self.base_url}/state", headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                return None
             if response.status_code == 200:
-                data = response.json()
-                return {
-                    'cpu_usage': data.get('cpu_usage', 0.0),  # Puede ser float
-                    'memory_usage': data.get('memory_usage', 0.0),
-                    'storage_usage': data.get('storage_usage', 0.0),
-                    'cpu_temp': data.get('cpu_temp', 0.0),
-                    'microscopes_count': len(data.get('microscopes', []))
-                }
-        except requests.exceptions.RequestException:
+                self.state = response.json()
+                self.state_etag = response.headers.get('ETag')
+            elif response.status_code != 304:
+                return None
+            self.state_time = time.monotonic()
+            return self.state
+    
+    def apply_event(self, event_type, payload):
+        """Aplica un evento del servidor a la copia local de /state"""
+        with self.state_lock:
+            if self.state is None:
+                return
+            if event_type == 'system':
+                self.state['system'].update(payload)
+            elif event_type == 'sensor':
+                self.state['sensor'] = dict(self.state.get('sensor') or {}, **payload)
+            elif event_type == 'settings':
+                self.state['settings'].update(payload)
+            elif event_type == 'led':
+                for microscope in self.state.get('microscopes', []):
+                    if microscope['id'] == payload.get('microscope_id'):
+                        microscope['config'].update(
+                            {key: payload[key] for key in ('led_on', 'led_intensity') if key in payload})
+            elif event_type == 'camera':
+                self.state_time = 0.0  # cambia la lista de microscopios: pedir /state completo
+    
+    def invalidate_state(self):
+        """Fuerza a revalidar el estado en la siguiente consulta"""
+        with self.state_lock:
+            self.state_time = 0.0
+    
+    def get_system_status(self):
+        state = self.get_state()
+        if state is None:
             return None
+        system = state['system']
+        return {
+            'cpu_usage': system.get('cpu_usage', 0.0),  # Puede ser float
+            'memory_usage': system.get('memory_usage', 0.0),
+            'storage_usage': system.get('storage_usage', 0.0),
+            'cpu_temp': system.get('cpu_temp', 0.0),
+            'microscopes_count': len(state.get('microscopes', []))
+        }
     
     def get_microscopes(self):
         """Obtiene la lista de microscopios disponibles"""
-        try:
-            response = self.session.get(f"{self.base_url}/list_microscopes", timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                return [microscope['id'] for microscope in data.get('microscopes', [])]
-            return []
-        except requests.exceptions.RequestException:
+        state = self.get_state()
+        if state is None:
             return []
+        return [microscope['id'] for microscope in state.get('microscopes', [])]
     
     def get_microscope_config(self, microscope_id):
+        state = self.get_state()
+        if state is None:
+            return None
+        for microscope in state.get('microscopes', []):
+            if microscope['id'] == microscope_id:
+                return microscope['config']
+        return {
+            'led_on': False,
+            'temperature': 0.0
+        }
+
+    def capture_image(self, microscope_id, **params):
+        """Captura una imagen; params admite width, height, roi='x,y,w,h' y thumb=1"""
         try:
             response = self.session.get(
-                f"{self.base_url}/microscope_config/{microscope_id}",
+                f"{self.base_url}/capture_image/{microscope_id}",
+                params=params,
                 timeout=self.timeout
             )
             if response.status_code == 200:
-                return response.json().get('config', {})
-            return {
-                'led_on': False,
-                'temperature': 0.0
-            }
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"capture_{microscope_id}_{timestamp}.jpg"
+                with open(filename, 'wb') as f:
+                    f.write(response.content)
+                return filename
         except requests.exceptions.RequestException:
             return None
     
-    def capture_image(self, microscope_id):
+    def get_histogram(self, microscope_id, **params):
+        """Obtiene los histogramas y estadísticas de luminosidad calculados en el servidor"""
         try:
             response = self.session.get(
-                f"{self.base_url}/capture_image/{microscope_id}",
+                f"{self.base_url}/histogram/{microscope_id}",
+                params=params,
                 timeout=self.timeout
             )
             if response.status_code == 200:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"capture_{microscope_id}_{timestamp}.jpg"
-                with open(filename, 'wb') as f:
-                    f.write(response.content)
-                return filename
+                data = response.json()
+                if data.get('success'):
+                    return data
+            return None
         except requests.exceptions.RequestException:
             return None
     
-    def set_led_state(self, microscope_id, state):
+    def stream_url(self, microscope_id):
+        """URL de la transmisión MJPEG en vivo de un microscopio"""
+        return f"{self.base_url}/stream/{microscope_id}"
+    
+    def set_led_state(self, microscope_id, state, session=None):
         try:
-            response = self.session.post(
+            response = (session or self.session).post(
                 f"{self.base_url}/set_led",
                 json={
                     'microscope_id': microscope_id,
@@ -78,13 +188,14 @@ class APIClient(QObject):
                 },
                 timeout=self.timeout
             )
+            self.invalidate_state()
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
     
-    def set_led_intensity(self, microscope_id, intensity):
+    def set_led_intensity(self, microscope_id, intensity, session=None):
         try:
-            response = self.session.post(
+            response = (session or self.session).post(
                 f"{self.base_url}/set_intensity",
                 json={
                     'microscope_id': microscope_id,
@@ -92,23 +203,32 @@ class APIClient(QObject):
                 },
                 timeout=self.timeout
             )
+            self.invalidate_state()
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
         
-    def get_data(self):
-        """Obtiene los datos del sensor DHT11"""
+    def set_leds(self, changes):
+        """Aplica una escena de iluminación en una sola petición.
+        
+        changes: lista de {'microscope_id', 'state' (opcional), 'intensity' (opcional)}
+        """
         try:
-            response = requests.get(f"{self.base_url}/get_data")
+            response = self.session.post(
+                f"{self.base_url}/set_leds",
+                json={'changes': changes},
+                timeout=self.timeout
+            )
+            self.invalidate_state()
             if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    return {
-                        'temperature': data.get('temperature'),
-                        'humidity': data.get('humidity'),
-                        'timestamp': data.get('timestamp')
-                    }
+                return response.json().get('leds')
+            return None
+        except requests.exceptions.RequestException:
+            return None
+    
+    def get_data(self):
+        """Obtiene los datos del sensor DHT11"""
+        state = self.get_state()
+        if state is None or not state.get('sensor'):
             return None
-        except Exception as e:
-            print(f"Error al obtener datos del sensor: {e}")
-            return None
\ No newline at end of file
+        return dict(state['sensor'])
\ No newline at end of file
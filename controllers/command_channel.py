@@ -0,0 +1,82 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from collections import OrderedDict
+import threading
+import time
+import requests
+
+
+class CommandChannel(QThread):
+    """Envía los cambios de ajustes en segundo plano, quedándose solo con el último valor.
+
+    Mientras un envío está en curso, los valores nuevos de un mismo
+    (microscopio, ajuste) reemplazan al pendiente, y los envíos se espacian al
+    menos min_interval segundos: arrastrar un slider produce unas pocas
+    peticiones y nunca bloquea la interfaz.
+    """
+
+    command_acknowledged = pyqtSignal(str, str, object)  # microscope_id, ajuste, valor final
+    command_failed = pyqtSignal(str, str, object)
+
+    def __init__(self, api_client, min_interval=0.2):
+        super().__init__()
+        self.api_client = api_client
+        self.min_interval = min_interval
+        # Sesión propia: requests.Session no es segura entre hilos y la del
+        # APIClient la usan a la vez la interfaz y los MicroscopeThread
+        self.session = requests.Session()
+        self.senders = {
+            'led_intensity': lambda mid, value: api_client.set_led_intensity(mid, value, session=self.session),
+            'led_state': lambda mid, value: api_client.set_led_state(mid, value, session=self.session)
+        }
+        self.pending = OrderedDict()  # (microscope_id, ajuste) -> último valor
+        self.condition = threading.Condition()
+        self.running = True
+        self.sent = 0
+        self.coalesced = 0
+
+    def submit(self, microscope_id, setting, value):
+        """Encola un valor; reemplaza al pendiente del mismo microscopio y ajuste"""
+        if setting not in self.senders:
+            raise ValueError(f"Ajuste desconocido: {setting}")
+        with self.condition:
+            key = (microscope_id, setting)
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = value
+            self.condition.notify()
+
+    def run(self):
+        last_send = 0.0
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running and not self.pending:
+                    return
+            # Limitar la frecuencia; durante la espera se siguen agrupando valores
+            wait = last_send + self.min_interval - time.monotonic()
+            if wait > 0 and self.running:
+                time.sleep(wait)
+            with self.condition:
+                if not self.pending:
+                    continue
+                (microscope_id, setting), value = self.pending.popitem(last=False)
+
+            last_send = time.monotonic()
+            ok = self.senders[setting](microscope_id, value)
+            self.sent += 1
+            with self.condition:
+                superseded = (microscope_id, setting) in self.pending
+            if not ok:
+                self.command_failed.emit(microscope_id, setting, value)
+            elif not superseded:
+                # Solo se informa del estado final, no de los valores intermedios
+                self.command_acknowledged.emit(microscope_id, setting, value)
+
+    def stop(self):
+        """Envía lo pendiente y detiene el hilo"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait()
+        self.session.close()
@@ -0,0 +1,116 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+import requests
+import json
+
+# Con el canal de eventos activo, los temporizadores solo sirven de respaldo
+FALLBACK_POLL_MS = 30000
+
+
+class EventSubscriber(QThread):
+    """Recibe los eventos del servidor (/events, Server-Sent Events) y los emite como señales"""
+
+    event_received = pyqtSignal(str, dict)
+    led_changed = pyqtSignal(str, dict)       # microscope_id, {'led_on'} o {'led_intensity'}
+    settings_changed = pyqtSignal(dict)
+    sensor_updated = pyqtSignal(dict)
+    camera_changed = pyqtSignal(str, bool)    # microscope_id, conectado
+    system_updated = pyqtSignal(dict)
+    resync_required = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, api_client):
+        super().__init__()
+        self.api_client = api_client
+        self.running = True
+        self.connected = False
+        self.last_event_id = None
+        self.retry_ms = 2000
+        self.response = None
+        # Sesión propia: requests.Session no es segura entre hilos y esta conexión es de larga duración
+        self.session = requests.Session()
+
+    def run(self):
+        while self.running:
+            headers = {'Accept': 'text/event-stream'}
+            if self.last_event_id is not None:
+                headers['Last-Event-ID'] = self.last_event_id
+            try:
+                # Lectura de hasta 60 s: el servidor envía keep-alive con más frecuencia,
+                # así que agotarlo indica una conexión caída
+                response = self.response = self.session.get(
+                    f"{self.api_client.base_url}/events",
+                    headers=headers,
+                    stream=True,
+                    timeout=(self.api_client.timeout, 60)
+                )
+                if response.status_code == 200:
+                    self.set_connected(True)
+                    # Lo ocurrido mientras estábamos desconectados llega como reenvío o resync
+                    self.read_events(response)
+                response.close()
+            except (requests.exceptions.RequestException, AttributeError, ValueError):
+                # stop() cierra la respuesta desde otro hilo: la lectura falla y se sale
+                pass
+            self.set_connected(False)
+            if self.running:
+                self.msleep(self.retry_ms)
+
+    def read_events(self, response):
+        """Interpreta el flujo SSE línea a línea"""
+        event_type, data, event_id = 'message', [], None
+        for line in response.iter_lines(decode_unicode=True):
+            if not self.running:
+                break
+            if line is None:
+                continue
+            if line == '':
+                if data:
+                    if event_id is not None:
+                        self.last_event_id = event_id
+                    self.dispatch(event_type, '\n'.join(data))
+                event_type, data, event_id = 'message', [], None
+            elif line.startswith(':'):
+                continue  # comentario de keep-alive
+            else:
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'event':
+                    event_type = value
+                elif field == 'data':
+                    data.append(value)
+                elif field == 'id':
+                    event_id = value
+                elif field == 'retry' and value.isdigit():
+                    self.retry_ms = int(value)
+
+    def dispatch(self, event_type, raw):
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return
+        self.event_received.emit(event_type, payload)
+        if event_type == 'led':
+            self.led_changed.emit(payload.get('microscope_id', ''), payload)
+        elif event_type == 'settings':
+            self.settings_changed.emit(payload)
+        elif event_type == 'sensor':
+            self.sensor_updated.emit(payload)
+        elif event_type == 'camera':
+            self.camera_changed.emit(payload.get('microscope_id', ''), payload.get('connected', False))
+        elif event_type == 'system':
+            self.system_updated.emit(payload)
+        elif event_type == 'resync':
+            self.resync_required.emit()
+
+    def set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.connection_changed.emit(connected)
+
+    def stop(self):
+        self.running = False
+        response = self.response
+        if response is not None:
+            response.close()  # desbloquea iter_lines sin esperar al siguiente keep-alive
+        self.wait()
+        self.session.close()
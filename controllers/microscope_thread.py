@@ -1,6 +1,8 @@
 from PyQt6.QtCore import QThread, pyqtSignal
 import time
+import threading
 from datetime import datetime
+from controllers.event_subscriber import FALLBACK_POLL_MS
 
 class MicroscopeThread(QThread):
     status_updated = pyqtSignal(dict)
@@ -9,17 +11,30 @@ class MicroscopeThread(QThread):
         super().__init__()
         self.microscope_id = microscope_id
         self.api_client = api_client
+        self.running = True
+        self.wake = threading.Event()
+        self.status = {'led_on': False, 'temperature': 0.0}
+        
+        # Con el canal de eventos, los cambios llegan al instante y el sondeo es solo de respaldo
+        if api_client.events is not None:
+            api_client.events.led_changed.connect(self.on_led_changed)
+    
+    def on_led_changed(self, microscope_id, change):
+        if microscope_id == self.microscope_id and 'led_on' in change:
+            self.status['led_on'] = change['led_on']
+            self.status_updated.emit(dict(self.status))
     
     def run(self):
-        while True:
+        while self.running:
             # Obtener estado actual del microscopio
             config = self.api_client.get_microscope_config(self.microscope_id)
             if config:
-                self.status_updated.emit({
-                    'led_on': config.get('led_on', False),
-                    'temperature': config.get('temperature', 0.0)
-                })
-            self.msleep(2000)  # Actualizar cada 2 segundos
+                self.status['led_on'] = config.get('led_on', False)
+                self.status['temperature'] = config.get('temperature', 0.0)
+                self.status_updated.emit(dict(self.status))
+            # Actualizar cada 2 segundos (o cada FALLBACK_POLL_MS con eventos)
+            interval = FALLBACK_POLL_MS if self.api_client.events_connected() else 2000
+            self.wake.wait(interval / 1000)
     
     def capture_image(self):
         image_path = self.api_client.capture_image(self.microscope_id)
@@ -28,4 +43,5 @@ class MicroscopeThread(QThread):
     
     def stop(self):
         self.running = False
+        self.wake.set()
         self.wait()
\ No newline at end of file
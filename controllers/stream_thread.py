@@ -0,0 +1,51 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+import requests
+
+class StreamThread(QThread):
+    frame_received = pyqtSignal(bytes)
+
+    def __init__(self, microscope_id, api_client):
+        super().__init__()
+        self.microscope_id = microscope_id
+        self.api_client = api_client
+        self.running = True
+        self.response = None
+        # Sesión propia: requests.Session no es segura entre hilos y esta conexión es de larga duración
+        self.session = requests.Session()
+
+    def run(self):
+        while self.running:
+            try:
+                response = self.response = self.session.get(
+                    self.api_client.stream_url(self.microscope_id),
+                    stream=True,
+                    timeout=self.api_client.timeout
+                )
+                buffer = b''
+                for chunk in response.iter_content(chunk_size=16384):
+                    if not self.running:
+                        break
+                    buffer += chunk
+                    # Extraer los JPEG completos (SOI ... EOI) del flujo multipart
+                    start = buffer.find(b'\xff\xd8')
+                    end = buffer.find(b'\xff\xd9', start + 2)
+                    while start != -1 and end != -1:
+                        self.frame_received.emit(buffer[start:end + 2])
+                        buffer = buffer[end + 2:]
+                        start = buffer.find(b'\xff\xd8')
+                        end = buffer.find(b'\xff\xd9', start + 2)
+                response.close()
+                if self.running:
+                    self.msleep(1000)  # La transmisión terminó; reconectar
+            except (requests.exceptions.RequestException, AttributeError, ValueError):
+                # stop() cierra la respuesta desde otro hilo: la lectura falla y se sale
+                if self.running:
+                    self.msleep(2000)  # Reintentar tras un error de conexión
+
+    def stop(self):
+        self.running = False
+        response = self.response
+        if response is not None:
+            response.close()  # desbloquea iter_content sin esperar al siguiente frame
+        self.wait()
+        self.session.close()
@@ -1,17 +1,16 @@
 import time
-import RPi.GPIO as GPIO
-import board
-import adafruit_dht
 from threading import Thread, Event
-import json
-import os
+from hardwareBackend import get_backend
+from metrics import sensor_read_failures
+from sensorStore import SensorStore
+from configStore import ConfigStore
 
 # Configuracion inicial
 class SensorController:
     def __init__(self):
         # Configuracion de pines
         self.led_pin = 17
-        self.dht_pin = board.D4  # GPIO4
+        self.dht_pin = 4  # GPIO4
         
         # Configuracion inicial
         self.interval = 5  # segundos (valor por defecto)
@@ -19,48 +18,47 @@ class SensorController:
         self.led_state = False
         self.running = True
         
-        # Configurar GPIO
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.led_pin, GPIO.OUT)
+        # Configurar GPIO (Raspberry Pi real o simulador)
+        self.hardware = get_backend()
+        self.hardware.setup_output(self.led_pin)
         
         # Configurar PWM para el LED
-        self.pwm = GPIO.PWM(self.led_pin, 100)  # Frecuencia 100Hz
+        self.pwm = self.hardware.pwm(self.led_pin, 100)  # Frecuencia 100Hz
         self.pwm.start(0)  # Iniciar con duty cycle 0
         
         # Sensor DHT11
-        self.dht_sensor = adafruit_dht.DHT11(self.dht_pin)
+        self.dht_sensor = self.hardware.dht11(self.dht_pin)
         
+        # Histórico de lecturas (segmentos binarios diarios)
+        self.sensor_store = SensorStore()
+
         # Evento para sincronizacion
         self.stop_event = Event()
         
-        # Crear archivo de configuracion si no existe
+        # Configuracion en memoria con guardado diferido (se crea el archivo si no existe)
         self.config_file = 'sensor_config.json'
-        if not os.path.exists(self.config_file):
-            self.save_config()
+        self.config_store = ConfigStore(self.config_file, defaults=self.current_config())
         
         # Cargar configuracion
         self.load_config()
-        
-    def save_config(self):
-        config = {
+    
+    def current_config(self):
+        return {
             'interval': self.interval,
             'led_intensity': self.led_intensity,
             'led_state': self.led_state
         }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f)
+    
+    def save_config(self):
+        # Solo actualiza la memoria; el disco se escribe agrupando los cambios
+        self.config_store.update(self.current_config())
     
     def load_config(self):
-        try:
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-                self.interval = config.get('interval', self.interval)
-                self.led_intensity = config.get('led_intensity', self.led_intensity)
-                self.led_state = config.get('led_state', self.led_state)
-                self.update_led()
-        except:
-            pass
+        config = self.config_store.snapshot()
+        self.interval = config.get('interval', self.interval)
+        self.led_intensity = config.get('led_intensity', self.led_intensity)
+        self.led_state = config.get('led_state', self.led_state)
+        self.update_led()
     
     def update_led(self):
         if self.led_state:
@@ -80,6 +78,7 @@ class SensorController:
                 }
         except RuntimeError as e:
             print(f"Error reading sensor: {e}")
+        sensor_read_failures.inc(f"gpio{self.dht_pin}")
         return None
     
     def run_loop(self):
@@ -88,8 +87,7 @@ class SensorController:
             data = self.read_sensor()
             if data:
                 print(f"Datos: Temp={data['temperature']}°C, Hum={data['humidity']}%")
-                with open('sensor_data.log', 'a') as f:
-                    f.write(f"{data}\n")
+                self.sensor_store.append(time.time(), data['temperature'], data['humidity'])
             
             # Encender LED si esta activado
             if self.led_state:
@@ -104,8 +102,10 @@ class SensorController:
         self.running = False
         self.stop_event.set()
         self.pwm.stop()
+        self.config_store.close()
+        self.sensor_store.close()
         self.dht_sensor.exit()  # Limpieza del sensor DHT
-        GPIO.cleanup()
+        self.hardware.cleanup()
 
 # Iniciar el servicio
 def start_service():
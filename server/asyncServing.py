@@ -0,0 +1,162 @@
+import time
+import asyncio
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from metrics import http_requests, http_latency
+
+
+class AsyncApp:
+    """Aplicación ASGI: rutas asíncronas nativas y el resto a Flask.
+
+    Las rutas de async_routes (transmisiones largas) se atienden en el bucle
+    de eventos sin ocupar hilos. Las demás peticiones van a la aplicación
+    Flask a través de a2wsgi, que la ejecuta en un pool acotado de hilos
+    porque sus manejadores pueden bloquear en cámaras o GPIO.
+    """
+
+    def __init__(self, app, workers=8, async_routes=None, on_shutdown=None):
+        self.wsgi = WSGIMiddleware(app, workers=workers)
+        # [(regex compilada, regla para las métricas, corrutina(cabeceras, match))]
+        self.async_routes = async_routes or []
+        self.on_shutdown = on_shutdown
+        self.loop = None
+        self.closing = None  # se activa al recibir la señal de parada: cierra las transmisiones
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] == 'http':
+            for pattern, rule, handler in self.async_routes:
+                match = pattern.fullmatch(scope['path'])
+                if match and await self.handle_async(scope, receive, send, rule, handler, match):
+                    return
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.loop = asyncio.get_running_loop()
+                self.closing = asyncio.Event()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # uvicorn ya cerró las conexiones: liberar cámaras, GPIO, etc.
+                if self.on_shutdown:
+                    await asyncio.get_running_loop().run_in_executor(None, self.on_shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle_async(self, scope, receive, send, rule, handler, match):
+        """Atiende una ruta asíncrona; devuelve False si debe responderla Flask"""
+        start = time.perf_counter()
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                   for name, value in scope['headers']}
+        result = await handler(headers, match)
+        if result is None:
+            return False
+
+        status, response_headers, chunks = result
+        code = int(status.split(' ', 1)[0])
+        # Mismas cabeceras CORS que añade flask_cors con su configuración por defecto
+        origin = headers.get('origin')
+        response_headers = response_headers + (
+            [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')] if origin
+            else [('Access-Control-Allow-Origin', '*')])
+        # Mismas métricas que record_request_metrics (tiempo hasta las cabeceras)
+        http_latency.observe(time.perf_counter() - start, rule, scope['method'])
+        http_requests.inc(rule, scope['method'], str(code))
+
+        await self.send_stream(receive, send, code, response_headers, chunks)
+        return True
+
+    def close_streams(self):
+        """Termina las transmisiones abiertas para que uvicorn no espere por ellas al detenerse"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.closing.set)
+
+    async def wait_stop(self, receive):
+        """Termina cuando el cliente se desconecta o el servidor se detiene"""
+        closing = asyncio.ensure_future(self.closing.wait())
+        try:
+            while not closing.done():
+                message = asyncio.ensure_future(receive())
+                await asyncio.wait({message, closing}, return_when=asyncio.FIRST_COMPLETED)
+                if message.done() and message.result()['type'] == 'http.disconnect':
+                    return
+                message.cancel()
+        finally:
+            closing.cancel()
+
+    async def send_stream(self, receive, send, code, headers, chunks):
+        """Envía una respuesta continua desde un generador asíncrono hasta que el cliente se va"""
+        # uvicorn descarta en silencio lo enviado tras la desconexión: hay que vigilarla
+        stop = asyncio.ensure_future(self.wait_stop(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': code,
+                'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            })
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait({next_chunk, stop}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_chunk.done():
+                    next_chunk.cancel()
+                    await asyncio.wait({next_chunk})
+                    break
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            stop.cancel()
+            await chunks.aclose()
+
+
+class AsyncServer:
+    """Servidor de producción: uvicorn con la aplicación Flask y las rutas asíncronas.
+
+    El análisis de HTTP (Content-Length, chunked, Expect: 100-continue,
+    HTTP/1.0) queda en manos de uvicorn.
+    """
+
+    def __init__(self, app, host='0.0.0.0', port=5000, max_connections=512, workers=8,
+                 idle_timeout=75.0, max_body=16 * 1024 * 1024, shutdown_timeout=10.0,
+                 async_routes=None, on_shutdown=None):
+        app.config.setdefault('MAX_CONTENT_LENGTH', max_body)  # Flask responde 413
+        self.asgi_app = AsyncApp(app, workers, async_routes, on_shutdown)
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.shutdown_timeout = shutdown_timeout
+
+    def run(self):
+        """Bloquea hasta recibir SIGINT/SIGTERM y después cierra ordenadamente"""
+        print(f"Servidor asíncrono en http://{self.host}:{self.port} "
+              f"(máx. {self.max_connections} conexiones, {self.workers} hilos WSGI)")
+        config = uvicorn.Config(self.asgi_app, host=self.host, port=self.port, lifespan='on',
+                                limit_concurrency=self.max_connections, backlog=self.max_connections,
+                                timeout_keep_alive=int(self.idle_timeout),
+                                timeout_graceful_shutdown=int(self.shutdown_timeout),
+                                access_log=False)
+        try:
+            StreamingServer(config, self.asgi_app).run()
+        except KeyboardInterrupt:
+            pass  # uvicorn vuelve a lanzar SIGINT tras el cierre ordenado
+
+
+class StreamingServer(uvicorn.Server):
+    """uvicorn.Server que cierra las transmisiones al recibir la señal de parada"""
+
+    def __init__(self, config, asgi_app):
+        super().__init__(config)
+        self.asgi_app = asgi_app
+
+    def handle_exit(self, sig, frame):
+        self.asgi_app.close_streams()
+        super().handle_exit(sig, frame)
@@ -0,0 +1,55 @@
+import os
+import re
+import glob
+import fcntl
+import struct
+
+# ioctl VIDIOC_QUERYCAP = _IOR('V', 0, struct v4l2_capability) (104 bytes)
+VIDIOC_QUERYCAP = 0x80685600
+V4L2_CAPABILITY_FORMAT = '16s32s32sIII3I'
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_VIDEO_CAPTURE_MPLANE = 0x00001000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+def list_video_devices():
+    """Lista los nodos /dev/videoN ordenados por número de dispositivo"""
+    return sorted(glob.glob('/dev/video*'), key=lambda d: device_number(d) or 0)
+
+
+def device_number(device):
+    """Número N de /dev/videoN (o None)"""
+    match = re.search(r'(\d+)$', device)
+    return int(match.group(1)) if match else None
+
+
+def query_capabilities(device):
+    """Consulta VIDIOC_QUERYCAP; devuelve (driver, tarjeta, capacidades) o None"""
+    try:
+        fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buffer = bytearray(struct.calcsize(V4L2_CAPABILITY_FORMAT))
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buffer)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+    driver, card, _, _, capabilities, device_caps, *_ = struct.unpack(V4L2_CAPABILITY_FORMAT, buffer)
+    if capabilities & V4L2_CAP_DEVICE_CAPS:
+        capabilities = device_caps  # capacidades de este nodo concreto
+    return (
+        driver.split(b'\0', 1)[0].decode(errors='replace'),
+        card.split(b'\0', 1)[0].decode(errors='replace'),
+        capabilities
+    )
+
+
+def is_capture_device(device):
+    """True si el nodo puede producir frames (descarta nodos de metadatos)"""
+    info = query_capabilities(device)
+    if info is None:
+        return False
+    return bool(info[2] & (V4L2_CAP_VIDEO_CAPTURE | V4L2_CAP_VIDEO_CAPTURE_MPLANE))
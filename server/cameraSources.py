@@ -0,0 +1,159 @@
+import os
+import glob
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tif', '*.tiff')
+
+
+class CameraSource:
+    """Interfaz común de las fuentes de frames (mismos métodos que cv2.VideoCapture)"""
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def grab(self):
+        raise NotImplementedError
+
+    def retrieve(self):
+        raise NotImplementedError
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+class PacedSource(CameraSource):
+    """Base para fuentes virtuales que entregan frames a un ritmo fijo"""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frame_index = -1
+        self.next_frame = None
+
+    def wait_frame_slot(self):
+        """Espera al instante del siguiente frame sin acumular deriva"""
+        now = time.monotonic()
+        if self.next_frame is None or now - self.next_frame > 1.0:
+            self.next_frame = now  # primer frame o tras una pausa larga
+        elif self.next_frame > now:
+            time.sleep(self.next_frame - now)
+        self.next_frame += 1.0 / self.fps
+        self.frame_index += 1
+
+
+class OpenCVSource(CameraSource):
+    """Cámara USB real a través de OpenCV/V4L2"""
+
+    def __init__(self, index, width=1280, height=720, fps=15):
+        self.capture = cv2.VideoCapture(index, cv2.CAP_V4L2)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def grab(self):
+        return self.capture.grab()
+
+    def retrieve(self):
+        return self.capture.retrieve()
+
+    def read(self):
+        return self.capture.read()
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticSource(PacedSource):
+    """Frames sintéticos deterministas: fondo fijo por semilla y un marcador en movimiento"""
+
+    def __init__(self, width=1280, height=720, fps=15, seed=0):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+
+        # Fondo con gradiente y ruido reproducible
+        rng = np.random.default_rng(seed)
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = np.empty((height, width, 3), dtype=np.float32)
+        base[..., 0] = x
+        base[..., 1] = y
+        base[..., 2] = (x + y) / 2
+        base += rng.normal(0, 8, base.shape)
+        self.background = np.clip(base, 0, 255).astype(np.uint8)
+        self.marker = max(8, min(width, height) // 8)
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        self.wait_frame_slot()
+        return True
+
+    def retrieve(self):
+        frame = self.background.copy()
+        # El marcador y el contador dependen solo del índice de frame
+        span_x = max(1, self.width - self.marker)
+        span_y = max(1, self.height - self.marker)
+        x = (self.frame_index * 7) % span_x
+        y = (self.frame_index * 3) % span_y
+        cv2.rectangle(frame, (x, y), (x + self.marker, y + self.marker), (255, 255, 255), -1)
+        cv2.putText(frame, str(self.frame_index), (10, self.height - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+        return True, frame
+
+
+class ReplaySource(PacedSource):
+    """Reproduce un directorio de imágenes o un archivo de video a un ritmo configurable"""
+
+    def __init__(self, path, fps=15, loop=True):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.video = None
+        self.files = []
+        self.current = None
+
+        if os.path.isdir(path):
+            for pattern in IMAGE_EXTENSIONS:
+                self.files.extend(glob.glob(os.path.join(path, pattern)))
+            self.files.sort()
+        else:
+            self.video = cv2.VideoCapture(path)
+
+    def isOpened(self):
+        return bool(self.files) or (self.video is not None and self.video.isOpened())
+
+    def grab(self):
+        self.wait_frame_slot()
+        if self.files:
+            if not self.loop and self.frame_index >= len(self.files):
+                return False
+            self.current = self.files[self.frame_index % len(self.files)]
+            return True
+
+        ok = self.video.grab()
+        if not ok and self.loop:
+            # Volver al principio del video
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok = self.video.grab()
+        return ok
+
+    def retrieve(self):
+        if self.files:
+            frame = cv2.imread(self.current, cv2.IMREAD_COLOR)
+            return frame is not None, frame
+        return self.video.retrieve()
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
@@ -0,0 +1,180 @@
+import os
+import json
+import select
+import struct
+import ctypes
+import ctypes.util
+from threading import Thread, Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from cameraDevices import list_video_devices, device_number, is_capture_device
+
+# Constantes de inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+BY_PATH_DIR = '/dev/v4l/by-path'
+
+
+class CameraIdMap:
+    """Asigna IDs estables (microscope_N) según la ubicación física del dispositivo"""
+
+    def __init__(self, path='camera_ids.json'):
+        self.path = path
+        self.ids = {}  # clave física -> ID
+        try:
+            with open(self.path, 'r') as f:
+                self.ids = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def physical_key(device):
+        """Ruta en /dev/v4l/by-path (puerto USB) o, si no existe, el propio nodo"""
+        try:
+            for name in os.listdir(BY_PATH_DIR):
+                link = os.path.join(BY_PATH_DIR, name)
+                if os.path.realpath(link) == os.path.realpath(device):
+                    return name
+        except OSError:
+            pass
+        return device
+
+    def get_id(self, device):
+        """ID del dispositivo; los nuevos reciben el menor número libre"""
+        key = self.physical_key(device)
+        if key not in self.ids:
+            used = set(self.ids.values())
+            number = 1
+            while f"microscope_{number}" in used:
+                number += 1
+            self.ids[key] = f"microscope_{number}"
+            self.save()
+        return self.ids[key]
+
+    def save(self):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.ids, f, indent=4)
+        except OSError as e:
+            print(f"Error al guardar IDs de cámaras: {e}")
+
+
+class CameraWatcher:
+    """Detecta conexiones y desconexiones de /dev/video* (inotify o sondeo)"""
+
+    def __init__(self, on_added, on_removed, poll_interval=2.0, settle_delay=0.5):
+        self.on_added = on_added      # on_added(device)
+        self.on_removed = on_removed  # on_removed(device)
+        self.poll_interval = poll_interval
+        self.settle_delay = settle_delay  # margen para que udev termine de configurar el nodo
+
+        self.known = set()
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.inotify_fd = None
+
+    def scan(self):
+        """Compara los dispositivos actuales con los conocidos y notifica los cambios"""
+        with self.lock:
+            present = set(list_video_devices())
+            for device in sorted(self.known - present, key=device_number):
+                self.known.discard(device)
+                print(f"Cámara desconectada: {device}")
+                self.on_removed(device)
+
+            # Sondeo en paralelo; los nodos sin permisos o de metadatos
+            # se vuelven a probar en el siguiente escaneo
+            candidates = sorted(present - self.known, key=device_number)
+            if not candidates:
+                return
+            with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+                capture_flags = list(executor.map(is_capture_device, candidates))
+            for device, ok in zip(candidates, capture_flags):
+                if ok:
+                    self.known.add(device)
+                    print(f"Cámara conectada: {device}")
+                    self.on_added(device)
+
+    def start(self):
+        """Escaneo inicial síncrono y vigilancia en segundo plano"""
+        self.scan()
+        self.inotify_fd = self.open_inotify()
+        target = self.watch_inotify if self.inotify_fd is not None else self.watch_polling
+        self.thread = Thread(target=target, name='camera-watcher', daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def open_inotify():
+        """Crea un descriptor inotify sobre /dev; None si no está disponible"""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, b'/dev', IN_CREATE | IN_DELETE | IN_ATTRIB) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def watch_inotify(self):
+        print("Vigilancia de cámaras con inotify")
+        poller = select.poll()
+        poller.register(self.inotify_fd, select.POLLIN)
+        idle_polls = 0
+        while not self.stop_event.is_set():
+            if not poller.poll(self.poll_interval * 1000):
+                # Sondeo de respaldo por si se pierde algún evento
+                idle_polls += 1
+                if idle_polls >= 5:
+                    idle_polls = 0
+                    self.scan()
+                continue
+            try:
+                data = os.read(self.inotify_fd, 4096)
+            except BlockingIOError:
+                continue
+            if self.has_video_event(data):
+                self.stop_event.wait(self.settle_delay)
+                self.drain_inotify()
+                self.scan()
+        os.close(self.inotify_fd)
+
+    def drain_inotify(self):
+        """Descarta los eventos acumulados durante la espera"""
+        try:
+            while os.read(self.inotify_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def has_video_event(data):
+        """True si algún evento corresponde a un nodo video*"""
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].split(b'\0', 1)[0]
+            offset += length
+            if name.startswith(b'video'):
+                return True
+        return False
+
+    def watch_polling(self):
+        print("inotify no disponible: vigilancia de cámaras por sondeo")
+        while not self.stop_event.wait(self.poll_interval):
+            self.scan()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.poll_interval + 1)
+            self.thread = None
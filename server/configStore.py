@@ -0,0 +1,112 @@
+import os
+import json
+import copy
+from threading import Lock, Timer
+
+
+class ConfigStore:
+    """Configuración JSON en memoria con escritura diferida y atómica.
+
+    Los cambios se acumulan en memoria y se guardan como mucho una vez cada
+    `delay` segundos, escribiendo un archivo temporal que reemplaza al
+    original con os.replace(): un corte a mitad de escritura nunca deja el
+    archivo truncado.
+    """
+
+    def __init__(self, path, defaults=None, delay=2.0, indent=None):
+        self.path = path
+        self.delay = delay
+        self.indent = indent
+        self.data = copy.deepcopy(defaults or {})
+        self.lock = Lock()
+        self.write_lock = Lock()  # serializa las escrituras en disco
+        self.dirty = False
+        self.timer = None
+        self.writes = 0
+        self.load()
+
+    def load(self):
+        """Carga el archivo sobre los valores por defecto; si no existe o está dañado, lo recrea"""
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if not isinstance(stored, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            self.data.update(stored)
+            return
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            # Conservar el archivo dañado para poder revisarlo
+            print(f"Configuración dañada en {self.path} ({e}), se usan los valores por defecto")
+            try:
+                os.replace(self.path, self.path + '.corrupt')
+            except OSError:
+                pass
+        self.dirty = True
+        self.flush()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return copy.deepcopy(self.data.get(key, default))
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self.data)
+
+    def update(self, values=None, **kwargs):
+        """Modifica valores en memoria y programa el guardado"""
+        with self.lock:
+            for key, value in dict(values or {}, **kwargs).items():
+                if self.data.get(key) != value:
+                    self.data[key] = copy.deepcopy(value)
+                    self.dirty = True
+            # Un solo temporizador por ráfaga: los cambios siguientes se guardan juntos
+            if self.dirty and self.timer is None:
+                self.timer = Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Escribe los cambios pendientes ahora (temporal + fsync + os.replace)"""
+        with self.write_lock:
+            with self.lock:
+                self.timer = None
+                if not self.dirty:
+                    return
+                payload = json.dumps(self.data, indent=self.indent)
+                self.dirty = False
+
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.fsync_dir()
+                self.writes += 1
+            except OSError as e:
+                print(f"Error guardando configuración en {self.path}: {e}")
+                with self.lock:
+                    self.dirty = True  # reintentar en el próximo guardado
+
+    def fsync_dir(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Cancela el temporizador y guarda lo pendiente (al detener el servicio)"""
+        with self.lock:
+            timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
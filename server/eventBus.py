@@ -0,0 +1,117 @@
+import json
+import time
+import asyncio
+from collections import deque
+from threading import Lock, Condition
+
+
+def format_event(event):
+    """Serializa un evento (id, tipo, datos JSON) en formato Server-Sent Events"""
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """Cola de eventos pendientes de un cliente; se cierra si el cliente no da abasto"""
+
+    def __init__(self, max_pending=256, loop=None):
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.condition = Condition()
+        self.closed = False
+        # Espectadores asíncronos: se despiertan desde otros hilos con call_soon_threadsafe
+        self.loop = loop
+        self.wakeup = asyncio.Event() if loop else None
+
+    def push(self, event):
+        with self.condition:
+            if self.closed:
+                return
+            if len(self.pending) >= self.max_pending:
+                # El cliente se reconectará con Last-Event-ID y recuperará lo perdido
+                self.closed = True
+            else:
+                self.pending.append(event)
+            self.condition.notify()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def drain(self):
+        events = list(self.pending)
+        self.pending.clear()
+        return events
+
+    def get(self, timeout):
+        """Eventos pendientes; lista vacía si vence el timeout"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not self.pending and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.condition.wait(remaining)
+            return self.drain()
+
+    async def get_async(self, timeout):
+        with self.condition:
+            if self.pending or self.closed:
+                return self.drain()
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.wakeup.clear()
+        with self.condition:
+            return self.drain()
+
+
+class EventBus:
+    """Publica cambios de estado a los clientes suscritos (SSE)"""
+
+    def __init__(self, history=512):
+        self.lock = Lock()
+        self.next_id = 1
+        self.history = deque(maxlen=history)  # para reenviar lo perdido al reconectar
+        self.subscribers = set()
+
+    def publish(self, event_type, data):
+        with self.lock:
+            event = (self.next_id, event_type, json.dumps(data))
+            self.next_id += 1
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscribe(self, last_event_id=None, loop=None):
+        """Nueva suscripción; con last_event_id reenvía los eventos posteriores"""
+        subscription = Subscription(loop=loop)
+        with self.lock:
+            if last_event_id is not None:
+                oldest = self.history[0][0] if self.history else self.next_id
+                if last_event_id + 1 < oldest or last_event_id >= self.next_id:
+                    # Eventos fuera del histórico o servidor reiniciado: el cliente debe recargar el estado
+                    subscription.pending.append((self.next_id - 1, 'resync', '{}'))
+                else:
+                    subscription.pending.extend(e for e in self.history if e[0] > last_event_id)
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def close(self):
+        """Termina todas las suscripciones (al detener el servidor)"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from threading import Lock, Event
+
+
+class EncodedFrameCache:
+    """Caché LRU de frames codificados, limitada por tamaño total en bytes"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # clave -> bytes codificados
+        self.size = 0
+        self.lock = Lock()
+
+        # Codificaciones en curso: las peticiones concurrentes esperan a la primera
+        self.in_flight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Devuelve los bytes en caché o None"""
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """Guarda una entrada y expulsa las menos usadas si se supera el límite"""
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def discard(self, owner):
+        """Elimina las entradas cuya clave empieza por owner (p. ej. un microscopio desconectado)"""
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == owner]:
+                self.size -= len(self.entries.pop(key))
+
+    def get_or_encode(self, key, encode):
+        """Devuelve la entrada en caché o la genera con encode() una sola vez"""
+        while True:
+            with self.lock:
+                data = self.entries.get(key)
+                if data is not None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                pending = self.in_flight.get(key)
+                if pending is None:
+                    pending = self.in_flight[key] = Event()
+                    self.misses += 1
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                # Otra petición está codificando el mismo frame
+                pending.wait()
+                continue
+
+            try:
+                data = encode()
+                if data is not None:
+                    self.put(key, data)
+                return data
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                pending.set()
+
+    def get_stats(self):
+        """Devuelve contadores de aciertos, fallos y expulsiones"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,123 @@
+import time
+from collections import deque
+from threading import Thread, Condition, Event, Lock
+from metrics import grab_seconds, lock_wait_seconds, frames_dropped
+
+
+class FrameGrabber:
+    """Lee continuamente una cámara y guarda los últimos frames en un buffer circular"""
+
+    def __init__(self, name, capture=None, lock=None, buffer_size=4, opener=None, retry_interval=2.0,
+                 max_failures=30):
+        self.name = name
+        self.capture = capture
+        self.lock = lock or Lock()  # Protege el acceso a la cámara
+
+        # Apertura diferida: opener() devuelve la cámara abierta o None
+        self.opener = opener
+        self.retry_interval = retry_interval
+        self.max_failures = max_failures  # lecturas fallidas seguidas antes de reabrir
+
+        # Buffer circular de (secuencia, timestamp, frame)
+        self.frames = deque(maxlen=buffer_size)
+        self.sequence = 0
+        self.condition = Condition()
+
+        self.stop_event = Event()
+        self.thread = None
+
+    def start(self):
+        """Inicia el hilo de captura (no hace nada si ya está en marcha)"""
+        with self.condition:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = Thread(target=self.run_loop, name=f"grabber-{self.name}", daemon=True)
+            self.thread.start()
+
+    @property
+    def ready(self):
+        """True cuando la cámara está abierta y ya produjo al menos un frame"""
+        return self.capture is not None and self.sequence > 0
+
+    def open_capture(self):
+        """Abre la cámara con opener(); devuelve False si no fue posible"""
+        capture = self.opener() if self.opener else None
+        if capture is None:
+            return False
+        with self.lock:
+            self.capture = capture
+        return True
+
+    def run_loop(self):
+        """Bucle de lectura: cada frame nuevo reemplaza al más antiguo del buffer"""
+        failures = 0
+        while not self.stop_event.is_set():
+            if self.capture is None and not self.open_capture():
+                self.stop_event.wait(self.retry_interval)
+                continue
+
+            wait_start = time.perf_counter()
+            with self.lock:
+                acquired = time.perf_counter()
+                lock_wait_seconds.observe(acquired - wait_start, self.name)
+                if self.capture is None:
+                    continue
+                ret, frame = self.capture.read()
+            grab_seconds.observe(time.perf_counter() - acquired, self.name)
+            if not ret:
+                failures += 1
+                frames_dropped.inc(self.name, 'read_error')
+                if self.opener and failures >= self.max_failures:
+                    # El dispositivo pudo reconectarse con el mismo nodo: reabrir
+                    print(f"Cámara {self.name} sin respuesta, reabriendo")
+                    with self.lock:
+                        self.capture.release()
+                        self.capture = None
+                    failures = 0
+                # Evitar un bucle ocupado si la cámara deja de responder
+                self.stop_event.wait(0.1)
+                continue
+            failures = 0
+
+            with self.condition:
+                self.sequence += 1
+                self.frames.append((self.sequence, time.time(), frame))
+                self.condition.notify_all()
+
+    def latest(self):
+        """Devuelve el frame más reciente (secuencia, timestamp, frame) o None"""
+        with self.condition:
+            if not self.frames:
+                return None
+            return self.frames[-1]
+
+    def wait_next(self, after_sequence=None, timeout=2.0):
+        """Espera a un frame con secuencia mayor que after_sequence (por defecto, el actual)"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            if after_sequence is None:
+                after_sequence = self.sequence
+            while self.sequence <= after_sequence:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stop_event.is_set():
+                    return None
+                self.condition.wait(remaining)
+            return self.frames[-1]
+
+    def stop(self):
+        """Detiene el hilo de captura"""
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def release(self):
+        """Detiene el hilo y libera la cámara"""
+        self.stop()
+        with self.lock:
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
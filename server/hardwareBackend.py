@@ -0,0 +1,321 @@
+import os
+import time
+import random
+from collections import deque
+from threading import Lock, Thread, Event
+
+# Backend de hardware: auto (RPi si está disponible, si no simulador), rpi o sim
+HARDWARE_BACKEND = os.environ.get('HARDWARE_BACKEND', 'auto')
+# PWM de los LED en la Raspberry Pi: soft (RPi.GPIO, un hilo de CPU por canal)
+# o pigpio (PWM por hardware en los pines que lo admiten y temporizado por DMA en el resto)
+PWM_DRIVER = os.environ.get('PWM_DRIVER', 'soft')
+# Simulador: emular el PWM por software con un hilo por canal (para medir su coste)
+SIM_PWM_THREADS = os.environ.get('SIM_PWM_THREADS', '0') == '1'
+
+
+class PigpioPWM:
+    """PWM de pigpiod con la misma interfaz que RPi.GPIO.PWM.
+
+    Los pines 12, 13, 18 y 19 usan los canales PWM del hardware; el resto
+    los temporiza el DMA del demonio. En ningún caso hay un hilo por canal
+    en este proceso.
+    """
+
+    HARDWARE_PINS = {12, 13, 18, 19}
+    RANGE = 1000  # resolución de 0.1 % para el PWM por DMA
+
+    def __init__(self, pi, pin, frequency):
+        self.pi = pi
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.hardware = pin in self.HARDWARE_PINS
+        if not self.hardware:
+            self.pi.set_PWM_range(pin, self.RANGE)
+
+    def write(self):
+        if self.hardware:
+            # Ciclo de trabajo del hardware en millonésimas
+            self.pi.hardware_PWM(self.pin, int(self.frequency), int(self.duty_cycle * 10000))
+        else:
+            self.pi.set_PWM_frequency(self.pin, int(self.frequency))
+            self.pi.set_PWM_dutycycle(self.pin, round(self.duty_cycle * self.RANGE / 100))
+
+    def start(self, duty_cycle):
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        if not 0 <= duty_cycle <= 100:
+            raise ValueError("El ciclo de trabajo debe estar entre 0 y 100")
+        self.duty_cycle = duty_cycle
+        self.write()
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self.write()
+
+    def stop(self):
+        self.duty_cycle = 0
+        self.write()
+
+
+class RPiBackend:
+    """GPIO/PWM y DHT11 reales de la Raspberry Pi"""
+
+    name = 'rpi'
+
+    def __init__(self, pwm_driver=PWM_DRIVER):
+        import RPi.GPIO as GPIO
+        import board
+        import adafruit_dht
+        self.GPIO = GPIO
+        self.board = board
+        self.adafruit_dht = adafruit_dht
+        self.pwm_driver = pwm_driver
+        self.pi = None
+        self.pwms = {}
+
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+
+        if pwm_driver == 'pigpio':
+            import pigpio
+            self.pi = pigpio.pi()
+            if not self.pi.connected:
+                raise RuntimeError("pigpiod no está en ejecución")
+        elif pwm_driver != 'soft':
+            raise ValueError(f"Driver PWM desconocido: {pwm_driver}")
+
+    def setup_output(self, pin):
+        self.GPIO.setup(pin, self.GPIO.OUT)
+
+    def pwm(self, pin, frequency):
+        if self.pi is not None:
+            self.pwms[pin] = PigpioPWM(self.pi, pin, frequency)
+        else:
+            self.pwms[pin] = self.GPIO.PWM(pin, frequency)
+        return self.pwms[pin]
+
+    def dht11(self, pin):
+        return self.adafruit_dht.DHT11(getattr(self.board, f"D{pin}"))
+
+    def cleanup(self):
+        if self.pi is not None:
+            for pwm in self.pwms.values():
+                pwm.stop()
+            self.pi.stop()
+        self.GPIO.cleanup()
+
+    def describe(self):
+        return {
+            'backend': self.name,
+            'pwm_driver': self.pwm_driver,
+            'pwm_pins': sorted(self.pwms),
+            'hardware_pwm_pins': sorted(pin for pin, pwm in self.pwms.items() if getattr(pwm, 'hardware', False))
+        }
+
+
+class SimulatedPWM:
+    """PWM simulado que registra cada cambio de ciclo de trabajo con su instante"""
+
+    def __init__(self, pin, frequency, history_size=10000):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+        self.history = deque(maxlen=history_size)  # (time.monotonic(), ciclo de trabajo)
+
+    def start(self, duty_cycle):
+        self.running = True
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        if not 0 <= duty_cycle <= 100:
+            raise ValueError("El ciclo de trabajo debe estar entre 0 y 100")
+        self.duty_cycle = duty_cycle
+        self.history.append((time.monotonic(), duty_cycle))
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+        self.history.append((time.monotonic(), 0))
+
+
+class SimulatedSoftPWM(SimulatedPWM):
+    """Emula el PWM por software de RPi.GPIO: un hilo que conmuta el pin en cada periodo.
+
+    Registra los flancos (time.monotonic(), nivel) para medir su fluctuación.
+    """
+
+    def __init__(self, pin, frequency, history_size=10000):
+        super().__init__(pin, frequency, history_size)
+        self.edges = deque(maxlen=history_size)
+        self.stop_event = Event()
+        self.thread = None
+
+    def start(self, duty_cycle):
+        super().start(duty_cycle)
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = Thread(target=self.run, name=f"soft-pwm-{self.pin}", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            period = 1.0 / self.frequency
+            high = period * self.duty_cycle / 100
+            if high > 0:
+                self.edges.append((time.monotonic(), 1))
+                time.sleep(high)
+            if high < period:
+                self.edges.append((time.monotonic(), 0))
+                time.sleep(period - high)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        super().stop()
+
+
+class SimulatedDHT11:
+    """DHT11 simulado con valores, latencia de lectura y tasa de fallos configurables"""
+
+    MIN_READ_INTERVAL = 2.0  # como adafruit_dht: lecturas más rápidas devuelven el valor previo
+
+    def __init__(self, temperature=24.0, humidity=45.0, noise=0.5, read_latency=0.25,
+                 failure_rate=0.2, seed=None):
+        self.base_temperature = temperature
+        self.base_humidity = humidity
+        self.noise = noise
+        self.read_latency = read_latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+        self.lock = Lock()
+        self.last_read = None
+        self._temperature = None
+        self._humidity = None
+        self.reads = 0
+        self.failures = 0
+
+    def measure(self):
+        """Simula una lectura del bus: bloquea read_latency y puede fallar"""
+        with self.lock:
+            now = time.monotonic()
+            if self.last_read is not None and now - self.last_read < self.MIN_READ_INTERVAL:
+                return
+            self.last_read = now
+            self.reads += 1
+            time.sleep(self.read_latency)
+            if self.random.random() < self.failure_rate:
+                self.failures += 1
+                raise RuntimeError("Checksum did not validate. Try again.")
+            # El DHT11 solo entrega valores enteros
+            self._temperature = round(self.base_temperature + self.random.gauss(0, self.noise))
+            self._humidity = round(self.base_humidity + self.random.gauss(0, self.noise * 2))
+
+    @property
+    def temperature(self):
+        self.measure()
+        return self._temperature
+
+    @property
+    def humidity(self):
+        self.measure()
+        return self._humidity
+
+    def exit(self):
+        pass
+
+
+class SimulatorBackend:
+    """Hardware simulado para ejecutar y medir el servidor fuera de una Raspberry Pi"""
+
+    name = 'sim'
+
+    def __init__(self, threaded_pwm=SIM_PWM_THREADS):
+        self.threaded_pwm = threaded_pwm
+        self.outputs = set()
+        self.pwms = {}
+        self.sensors = {}
+        self.cleaned_up = False
+        self.dht_config = {
+            'temperature': float(os.environ.get('SIM_TEMPERATURE', 24.0)),
+            'humidity': float(os.environ.get('SIM_HUMIDITY', 45.0)),
+            'read_latency': float(os.environ.get('SIM_DHT_LATENCY', 0.25)),
+            'failure_rate': float(os.environ.get('SIM_DHT_FAILURE_RATE', 0.2))
+        }
+
+    def setup_output(self, pin):
+        self.outputs.add(pin)
+
+    def pwm(self, pin, frequency):
+        if pin not in self.outputs:
+            raise RuntimeError(f"El pin {pin} no está configurado como salida")
+        pwm_class = SimulatedSoftPWM if self.threaded_pwm else SimulatedPWM
+        self.pwms[pin] = pwm_class(pin, frequency)
+        return self.pwms[pin]
+
+    def dht11(self, pin):
+        self.sensors[pin] = SimulatedDHT11(**self.dht_config)
+        return self.sensors[pin]
+
+    def cleanup(self):
+        for pwm in self.pwms.values():
+            pwm.stop()
+        self.cleaned_up = True
+        self.outputs.clear()
+
+    def get_pwm_history(self, pin):
+        """Cambios de ciclo de trabajo registrados en un pin"""
+        pwm = self.pwms.get(pin)
+        return list(pwm.history) if pwm else []
+
+    def describe(self):
+        return {
+            'backend': self.name,
+            'pwm_driver': 'sim-soft' if self.threaded_pwm else 'sim',
+            'pwm': {pin: pwm.duty_cycle for pin, pwm in self.pwms.items()},
+            'pwm_changes': {pin: len(pwm.history) for pin, pwm in self.pwms.items()},
+            'dht': {pin: {'reads': s.reads, 'failures': s.failures} for pin, s in self.sensors.items()}
+        }
+
+
+_backend = None
+
+
+def create_rpi_backend():
+    """RPiBackend con PWM_DRIVER; si pigpiod no está disponible se usa el PWM por software"""
+    if PWM_DRIVER != 'pigpio':
+        return RPiBackend()
+    try:
+        return RPiBackend()
+    except (ImportError, RuntimeError) as e:
+        # Seguimos en una Raspberry Pi: los LED deben funcionar aunque sea sin pigpiod
+        print(f"PWM por pigpio no disponible ({e}), usando PWM por software")
+        return RPiBackend(pwm_driver='soft')
+
+
+def get_backend():
+    """Backend de hardware compartido por todos los controladores"""
+    global _backend
+    if _backend is None:
+        if HARDWARE_BACKEND == 'sim':
+            _backend = SimulatorBackend()
+        elif HARDWARE_BACKEND == 'rpi':
+            _backend = create_rpi_backend()
+        else:
+            # Solo la falta de RPi.GPIO indica que no es una Raspberry Pi; cualquier
+            # otro fallo del hardware real se propaga en lugar de simularse
+            try:
+                import RPi.GPIO  # noqa: F401
+            except (ImportError, RuntimeError) as e:
+                print(f"Hardware de Raspberry Pi no disponible ({e}), usando simulador")
+                _backend = SimulatorBackend()
+            else:
+                _backend = create_rpi_backend()
+    return _backend
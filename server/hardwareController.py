@@ -1,17 +1,21 @@
 import time
-import RPi.GPIO as GPIO
-import board
-import adafruit_dht
 from threading import Thread, Event
-import json
-import os
+from hardwareBackend import get_backend
+from metrics import sensor_read_failures
+from sensorStore import SensorStore
+from configStore import ConfigStore
+from scheduler import Scheduler
 
 class CameraSystemController:
     def __init__(self):
         # Configuración de pines para cada cámara (ID: pin_GPIO)
+        # pulse_period/pulse_duration en None usan el intervalo y la duración generales;
+        # pulse_phase desplaza el pulso de cada cámara dentro de su periodo
         self.cameras = {
-            'cam1': {'led_pin': 17, 'led_intensity': 100, 'led_state': False},
-            'cam2': {'led_pin': 22, 'led_intensity': 100, 'led_state': False},
+            'cam1': {'led_pin': 17, 'led_intensity': 100, 'led_state': False,
+                     'pulse_period': None, 'pulse_phase': 0.0, 'pulse_duration': None},
+            'cam2': {'led_pin': 22, 'led_intensity': 100, 'led_state': False,
+                     'pulse_period': None, 'pulse_phase': 0.0, 'pulse_duration': None},
         }
         #     'cam3': {'led_pin': 22, 'led_intensity': 100, 'led_state': False},
         #     'cam4': {'led_pin': 23, 'led_intensity': 100, 'led_state': False}
@@ -22,55 +26,59 @@ class CameraSystemController:
         self.led_auto_on_duration = 1  # segundos que permanecen encendidos los LEDs en modo automático
         self.running = True
         
-        # Configurar GPIO
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
+        # Configurar GPIO (Raspberry Pi real o simulador)
+        self.hardware = get_backend()
         
         # Configurar PWM para cada LED
         self.pwms = {}
         for cam_id, config in self.cameras.items():
-            GPIO.setup(config['led_pin'], GPIO.OUT)
-            self.pwms[cam_id] = GPIO.PWM(config['led_pin'], 100)  # Frecuencia 100Hz
+            self.hardware.setup_output(config['led_pin'])
+            self.pwms[cam_id] = self.hardware.pwm(config['led_pin'], 100)  # Frecuencia 100Hz
             self.pwms[cam_id].start(0)  # Iniciar con duty cycle 0
         
         # Sensor DHT11 (único para todo el sistema)
-        self.dht_pin = board.D4  # GPIO4
-        self.dht_sensor = adafruit_dht.DHT11(self.dht_pin)
+        self.dht_pin = 4  # GPIO4
+        self.dht_sensor = self.hardware.dht11(self.dht_pin)
         
+        # Histórico de lecturas (segmentos binarios diarios)
+        self.sensor_store = SensorStore()
+
         # Evento para sincronización
         self.stop_event = Event()
         
-        # Archivo de configuración
+        # Planificador único (reloj monotónico): pulsos por cámara y muestreo del sensor
+        self.scheduler = Scheduler()
+        self.schedule_origin = None
+        self.pulse_off_timers = {}  # cam_id -> temporizador de apagado pendiente
+
+        # Configuración en memoria con guardado diferido (se crea el archivo si no existe)
         self.config_file = 'camera_system_config.json'
-        if not os.path.exists(self.config_file):
-            self.save_config()
+        self.config_store = ConfigStore(self.config_file, defaults=self.current_config(), indent=4)
         
         # Cargar configuración
         self.load_config()
-        
-    def save_config(self):
-        config = {
+    
+    def current_config(self):
+        return {
             'interval': self.interval,
             'led_auto_on_duration': self.led_auto_on_duration,
             'cameras': self.cameras
         }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=4)
+    
+    def save_config(self):
+        # Solo actualiza la memoria; el disco se escribe agrupando los cambios
+        self.config_store.update(self.current_config())
     
     def load_config(self):
-        try:
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-                self.interval = config.get('interval', self.interval)
-                self.led_auto_on_duration = config.get('led_auto_on_duration', self.led_auto_on_duration)
-                
-                # Actualizar configuración de cada cámara
-                for cam_id in self.cameras.keys():
-                    if cam_id in config.get('cameras', {}):
-                        self.cameras[cam_id].update(config['cameras'][cam_id])
-                        self.update_led(cam_id)
-        except Exception as e:
-            print(f"Error loading config: {e}")
+        config = self.config_store.snapshot()
+        self.interval = config.get('interval', self.interval)
+        self.led_auto_on_duration = config.get('led_auto_on_duration', self.led_auto_on_duration)
+        
+        # Actualizar configuración de cada cámara
+        for cam_id in self.cameras.keys():
+            if cam_id in config.get('cameras', {}):
+                self.cameras[cam_id].update(config['cameras'][cam_id])
+                self.update_led(cam_id)
     
     def update_led(self, cam_id):
         """Actualiza el estado del LED de una cámara específica"""
@@ -86,16 +94,48 @@ class CameraSystemController:
         for cam_id in self.cameras.keys():
             self.update_led(cam_id)
     
-    def auto_on_leds(self):
-        """Enciende todos los LEDs según su intensidad configurada por un tiempo determinado"""
-        for cam_id, pwm in self.pwms.items():
-            intensity = self.cameras[cam_id]['led_intensity']
-            pwm.ChangeDutyCycle(intensity)
-        
-        time.sleep(self.led_auto_on_duration)
-        
-        for pwm in self.pwms.values():
-            pwm.ChangeDutyCycle(0)
+    def pulse_settings(self, cam_id):
+        """Periodo, fase y duración efectivos del pulso automático de una cámara"""
+        config = self.cameras[cam_id]
+        period = config.get('pulse_period') or self.interval
+        duration = config.get('pulse_duration')
+        if duration is None:
+            duration = self.led_auto_on_duration
+        return period, config.get('pulse_phase') or 0.0, min(duration, period)
+    
+    def pulse_on(self, cam_id, due):
+        """Enciende el LED de una cámara y programa su apagado respecto al instante previsto"""
+        period, _, duration = self.pulse_settings(cam_id)
+        previous = self.pulse_off_timers.pop(cam_id, None)
+        if previous is not None:
+            previous.cancel()  # apagado pendiente de una configuración anterior
+        if duration <= 0:
+            return
+        self.pwms[cam_id].ChangeDutyCycle(self.cameras[cam_id]['led_intensity'])
+        # Con duración == periodo el apagado coincidiría con el siguiente encendido y,
+        # al dispararse después, dejaría el LED apagado: el LED queda encendido siempre
+        if duration < period:
+            self.pulse_off_timers[cam_id] = self.scheduler.call_at(
+                due + duration, lambda: self.update_led(cam_id))
+    
+    def sample_sensor(self, due):
+        """Tarea independiente de los pulsos: la lectura lenta del DHT11 no retrasa los LEDs"""
+        data = self.read_sensor()
+        if data:
+            print(f"Datos ambientales: Temp={data['temperature']}°C, Hum={data['humidity']}%")
+            self.sensor_store.append(time.time(), data['temperature'], data['humidity'])
+    
+    def schedule_jobs(self):
+        """(Re)programa las tareas; comparten origen para que las fases sean coherentes"""
+        if self.schedule_origin is None:
+            return
+        for cam_id in self.cameras:
+            period, phase, _ = self.pulse_settings(cam_id)
+            self.scheduler.add_job(f"pulse-{cam_id}", period,
+                                   lambda due, cam_id=cam_id: self.pulse_on(cam_id, due),
+                                   phase=phase, origin=self.schedule_origin)
+        self.scheduler.add_job('sensor', self.interval, self.sample_sensor,
+                               blocking=True, origin=self.schedule_origin)
     
     def read_sensor(self):
         """Lee el sensor DHT11 compartido"""
@@ -110,36 +150,32 @@ class CameraSystemController:
                 }
         except RuntimeError as e:
             print(f"Error reading sensor: {e}")
+        sensor_read_failures.inc(f"gpio{self.dht_pin}")
         return None
     
     def run_loop(self):
-        """Bucle principal del sistema"""
-        while self.running:
-            # Leer sensor
-            data = self.read_sensor()
-            if data:
-                print(f"Datos ambientales: Temp={data['temperature']}°C, Hum={data['humidity']}%")
-                with open('sensor_data.log', 'a') as f:
-                    f.write(f"{data}\n")
-            
-            # Encender LEDs en modo automático
-            self.auto_on_leds()
-            
-            # Esperar el intervalo (menos el tiempo que los LEDs estuvieron encendidos)
-            self.stop_event.wait(self.interval - self.led_auto_on_duration)
+        """Bucle principal del sistema: programa las tareas y espera a que se detenga"""
+        self.schedule_origin = time.monotonic()
+        self.schedule_jobs()
+        self.scheduler.start()
+        self.stop_event.wait()
+        self.scheduler.stop()
     
     def stop(self):
         """Detener el sistema y limpiar recursos"""
         self.running = False
         self.stop_event.set()
+        self.scheduler.stop()
         
         # Detener todos los PWMs
         for pwm in self.pwms.values():
             pwm.stop()
         
         # Limpiar sensor DHT
+        self.config_store.close()
+        self.sensor_store.close()
         self.dht_sensor.exit()
-        GPIO.cleanup()
+        self.hardware.cleanup()
 
 def start_service():
     controller = CameraSystemController()
@@ -159,6 +195,7 @@ def start_service():
             print("  intensity <cam_id> <0-100> - Ajustar intensidad")
             print("  interval <segundos> - Cambiar intervalo automático")
             print("  duration <segundos> - Cambiar duración encendido automático")
+            print("  pulse <cam_id> <periodo> <fase> <duración> - Pulso propio de una cámara (segundos)")
             print("  exit - Salir del programa")
             
             cmd = input("Comando: ").strip().lower().split()
@@ -175,7 +212,9 @@ def start_service():
                 print("\nEstado de las cámaras:")
                 for cam_id, config in controller.cameras.items():
                     state = "ENCENDIDO" if config['led_state'] else "APAGADO"
-                    print(f"{cam_id}: LED {state} (Intensidad: {config['led_intensity']}%)")
+                    period, phase, duration = controller.pulse_settings(cam_id)
+                    print(f"{cam_id}: LED {state} (Intensidad: {config['led_intensity']}%, "
+                          f"pulso cada {period}s, fase {phase}s, {duration}s encendido)")
                 print(f"\nIntervalo automático: {controller.interval}s")
                 print(f"Duración encendido automático: {controller.led_auto_on_duration}s")
                 
@@ -210,6 +249,7 @@ def start_service():
                     if interval >= 1:
                         controller.interval = interval
                         controller.save_config()
+                        controller.schedule_jobs()
                         print(f"Intervalo automático ajustado a {interval} segundos")
                     else:
                         print("El intervalo debe ser al menos 1 segundo")
@@ -222,12 +262,30 @@ def start_service():
                     if duration >= 0:
                         controller.led_auto_on_duration = duration
                         controller.save_config()
+                        controller.schedule_jobs()
                         print(f"Duración de encendido automático ajustada a {duration} segundos")
                     else:
                         print("La duración no puede ser negativa")
                 except ValueError:
                     print("Uso: duration <segundos>")
                     
+            elif cmd[0] == 'pulse' and len(cmd) > 4:
+                cam_id = cmd[1]
+                try:
+                    period, phase, duration = (float(v) for v in cmd[2:5])
+                    if cam_id not in controller.cameras:
+                        print(f"Cámara {cam_id} no encontrada")
+                    elif period <= 0 or phase < 0 or not 0 <= duration <= period:
+                        print("Se requiere periodo > 0, fase >= 0 y 0 <= duración <= periodo")
+                    else:
+                        controller.cameras[cam_id].update(
+                            pulse_period=period, pulse_phase=phase, pulse_duration=duration)
+                        controller.save_config()
+                        controller.schedule_jobs()
+                        print(f"Pulso de {cam_id}: cada {period}s, fase {phase}s, {duration}s encendido")
+                except ValueError:
+                    print("Uso: pulse <cam_id> <periodo> <fase> <duración>")
+            
             else:
                 print("Comando no reconocido")
                     
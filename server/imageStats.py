@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+
+BINS = np.arange(256, dtype=np.float64)
+
+
+def compute_histograms(frame):
+    """Histogramas de 256 niveles por canal (BGR) y de luminancia"""
+    histograms = {}
+    if frame.ndim == 3:
+        for index, name in enumerate(('blue', 'green', 'red')):
+            hist = cv2.calcHist([frame], [index], None, [256], [0, 256])
+            histograms[name] = hist.ravel().astype(np.int64)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = frame
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    histograms['luminance'] = hist.ravel().astype(np.int64)
+    return histograms
+
+
+def histogram_stats(hist):
+    """Calcula min, max, media, mediana, desviación y moda a partir de los bins"""
+    total = int(hist.sum())
+    if total == 0:
+        return None
+
+    nonzero = np.flatnonzero(hist)
+    mean = float((hist * BINS).sum() / total)
+    std = float(np.sqrt((hist * (BINS - mean) ** 2).sum() / total))
+
+    # Mediana como en np.median: promedio de los dos valores centrales
+    cumulative = np.cumsum(hist)
+    lower = int(np.searchsorted(cumulative, (total - 1) // 2, side='right'))
+    upper = int(np.searchsorted(cumulative, total // 2, side='right'))
+
+    return {
+        'min': int(nonzero[0]),
+        'max': int(nonzero[-1]),
+        'mean': mean,
+        'median': (lower + upper) / 2.0,
+        'std': std,
+        'mode': int(np.argmax(hist)),
+        'pixels': total
+    }
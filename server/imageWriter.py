@@ -0,0 +1,153 @@
+import os
+import time
+import queue
+from threading import Thread, Lock
+from metrics import write_seconds, frames_dropped
+
+FSYNC_POLICIES = ('never', 'batch', 'always')
+
+
+class ImageWriter:
+    """Guarda imágenes ya codificadas en disco desde un hilo en segundo plano"""
+
+    def __init__(self, max_queue=64, batch_size=8, fsync_policy='batch', put_timeout=0.05):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync no válida: {fsync_policy}")
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.fsync_policy = fsync_policy
+        self.put_timeout = put_timeout  # espera máxima cuando la cola está llena
+
+        # Métricas de contrapresión
+        self.stats_lock = Lock()
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'errors': 0,
+            'bytes_written': 0,
+            'batches': 0,
+            'max_queue_depth': 0,
+            'blocked_seconds': 0.0,
+            'last_batch_seconds': 0.0
+        }
+
+        self.running = True
+        self.thread = Thread(target=self.run_loop, name='image-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, filepath, data, camera=''):
+        """Encola una imagen; devuelve False si se descarta por cola llena"""
+        start = time.monotonic()
+        try:
+            self.queue.put((filepath, data, camera), timeout=self.put_timeout)
+        except queue.Full:
+            frames_dropped.inc(camera, 'writer_queue_full')
+            with self.stats_lock:
+                self.stats['dropped'] += 1
+                self.stats['blocked_seconds'] += time.monotonic() - start
+            print(f"Cola de escritura llena, imagen descartada: {filepath}")
+            return False
+
+        with self.stats_lock:
+            self.stats['enqueued'] += 1
+            self.stats['blocked_seconds'] += time.monotonic() - start
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue.qsize())
+        return True
+
+    def run_loop(self):
+        """Agrupa las imágenes pendientes en lotes y las escribe"""
+        while self.running or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.monotonic()
+            self.write_batch(batch)
+            with self.stats_lock:
+                self.stats['batches'] += 1
+                self.stats['last_batch_seconds'] = time.monotonic() - start
+
+            for _ in batch:
+                self.queue.task_done()
+
+    def write_batch(self, batch):
+        """Escribe un lote aplicando la política de fsync configurada"""
+        pending = []  # (fd, carpeta) para fsync al final del lote
+        written = 0
+        written_bytes = 0
+        errors = 0
+        for filepath, data, camera in batch:
+            start = time.perf_counter()
+            try:
+                fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    if self.fsync_policy == 'always':
+                        os.fsync(fd)
+                finally:
+                    if self.fsync_policy == 'batch':
+                        pending.append((fd, os.path.dirname(filepath) or '.'))
+                    else:
+                        os.close(fd)
+                written += 1
+                written_bytes += len(data)
+                write_seconds.observe(time.perf_counter() - start, camera)
+            except OSError as e:
+                errors += 1
+                print(f"Error al guardar imagen {filepath}: {e}")
+
+        if pending:
+            folders = set()
+            for fd, folder in pending:
+                try:
+                    os.fsync(fd)
+                except OSError as e:
+                    print(f"Error en fsync de imagen: {e}")
+                finally:
+                    os.close(fd)
+                folders.add(folder)
+            for folder in folders:
+                self.fsync_dir(folder)
+
+        with self.stats_lock:
+            self.stats['written'] += written
+            self.stats['bytes_written'] += written_bytes
+            self.stats['errors'] += errors
+
+    @staticmethod
+    def fsync_dir(folder):
+        """Sincroniza la entrada de directorio de los archivos nuevos"""
+        try:
+            fd = os.open(folder, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def get_stats(self):
+        """Devuelve una copia de las métricas actuales"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self.queue.qsize()
+        stats['queue_capacity'] = self.queue.maxsize
+        stats['fsync_policy'] = self.fsync_policy
+        return stats
+
+    def stop(self):
+        """Vacía la cola pendiente y detiene el hilo"""
+        self.running = False
+        self.thread.join(timeout=10.0)
@@ -0,0 +1,153 @@
+import os
+from threading import Lock
+
+# Pines GPIO para los LED de los microscopios: microscope_N usa LED_PINS[N-1], de modo
+# que el pin sigue al ID estable (camera_ids.json) y no al orden de conexión.
+# El 17 es el LED que ya maneja SensorController: se reutiliza su PWM.
+LED_PINS = [int(p) for p in os.environ.get('LED_PINS', '17,22,23,24').split(',') if p.strip()]
+LED_FREQUENCY = 100  # Hz, como CameraSystemController
+
+
+class LedDriver:
+    """Un canal PWM por microscopio, al estilo de CameraSystemController.pwms"""
+
+    def __init__(self, hardware, pins=LED_PINS, frequency=LED_FREQUENCY, existing=None):
+        self.hardware = hardware
+        self.frequency = frequency
+        self.pins = list(pins)
+        self.pwms = dict(existing or {})  # pin -> PWM ya creado (no se puede crear dos veces)
+        self.channels = {}  # microscope_id -> estado del canal
+        self.lock = Lock()
+
+    def pin_for(self, microscope_id):
+        """Pin fijo de un ID estable microscope_N; None si no tiene uno asignado"""
+        prefix, _, number = microscope_id.rpartition('_')
+        if prefix != 'microscope' or not number.isdigit() or not 1 <= int(number) <= len(self.pins):
+            return None
+        return self.pins[int(number) - 1]
+    
+    def attach(self, microscope_id, intensity=50):
+        """Asigna a un microscopio el pin de su ID; devuelve el pin o None"""
+        with self.lock:
+            if microscope_id in self.channels:
+                return self.channels[microscope_id]['pin']
+            pin = self.pin_for(microscope_id)
+            if pin is None:
+                print(f"No hay pin LED configurado para {microscope_id} (LED_PINS tiene {len(self.pins)})")
+                return None
+            owner = next((mid for mid, channel in self.channels.items() if channel['pin'] == pin), None)
+            if owner is not None:
+                print(f"El pin LED {pin} de {microscope_id} ya lo usa {owner}")
+                return None
+            pwm = self.pwms.get(pin)
+            if pwm is None:
+                self.hardware.setup_output(pin)
+                pwm = self.pwms[pin] = self.hardware.pwm(pin, self.frequency)
+                pwm.start(0)
+            else:
+                pwm.ChangeDutyCycle(0)
+            self.channels[microscope_id] = {
+                'pin': pin,
+                'pwm': pwm,
+                'led_on': False,
+                'led_intensity': intensity,
+                'duty': 0,
+                'strobe': None  # intensidad temporal durante una toma del time-lapse
+            }
+            return pin
+
+    def detach(self, microscope_id):
+        """Apaga el LED de un microscopio desconectado y libera su pin"""
+        with self.lock:
+            channel = self.channels.pop(microscope_id, None)
+            if channel is None:
+                return
+            channel['pwm'].ChangeDutyCycle(0)
+
+    @staticmethod
+    def target_duty(channel):
+        if channel['strobe'] is not None:
+            return channel['strobe']
+        return channel['led_intensity'] if channel['led_on'] else 0
+
+    def validate(self, microscope_id, state=None, intensity=None):
+        """Devuelve un mensaje de error o None si el cambio es aplicable"""
+        if microscope_id not in self.channels:
+            return f"Microscopio sin canal LED: {microscope_id}"
+        # bool es subclase de int: True no es una intensidad válida
+        if intensity is not None and (isinstance(intensity, bool) or not isinstance(intensity, (int, float))
+                                      or not 0 <= intensity <= 100):
+            return "La intensidad debe estar entre 0 y 100"
+        if state is not None and not isinstance(state, bool):
+            return "El estado debe ser true o false"
+        return None
+
+    def apply(self, changes):
+        """Aplica [(microscope_id, estado o None, intensidad o None)] en una sola pasada.
+
+        Se validan todos los cambios antes de tocar el hardware y solo se
+        escribe el ciclo de trabajo de los canales nombrados en changes. El
+        nuevo estado de cada canal se guarda después de escribir su PWM, así
+        que si la escritura falla el canal conserva el estado anterior.
+        Lanza ValueError sin aplicar nada si alguno no es válido.
+        """
+        with self.lock:
+            errors = [e for e in (self.validate(*change) for change in changes) if e]
+            if errors:
+                raise ValueError('; '.join(errors))
+
+            pending = {}
+            for microscope_id, state, intensity in changes:
+                channel = pending.setdefault(microscope_id, dict(self.channels[microscope_id]))
+                if state is not None:
+                    channel['led_on'] = state
+                if intensity is not None:
+                    channel['led_intensity'] = intensity
+
+            for microscope_id, channel in pending.items():
+                self.write(microscope_id, channel)
+            return {mid: self.describe_channel(self.channels[mid]) for mid, _, _ in changes}
+
+    def write(self, microscope_id, channel):
+        """Escribe el ciclo de trabajo de channel y, si lo acepta el PWM, lo guarda como estado actual"""
+        duty = self.target_duty(channel)
+        if duty != channel['duty']:
+            channel['pwm'].ChangeDutyCycle(duty)
+            channel['duty'] = duty
+        self.channels[microscope_id] = channel
+
+    def set(self, microscope_id, state=None, intensity=None):
+        return self.apply([(microscope_id, state, intensity)])[microscope_id]
+
+    def strobe(self, microscope_id, on, intensity=None):
+        """Enciende el LED para una toma o restaura el estado configurado"""
+        with self.lock:
+            if microscope_id not in self.channels:
+                return
+            if on:
+                error = self.validate(microscope_id, intensity=intensity)
+                if error:
+                    raise ValueError(error)
+            channel = dict(self.channels[microscope_id])
+            channel['strobe'] = intensity if on else None
+            self.write(microscope_id, channel)
+
+    @staticmethod
+    def describe_channel(channel):
+        return {
+            'pin': channel['pin'],
+            'led_on': channel['led_on'],
+            'led_intensity': channel['led_intensity'],
+            'duty': channel['duty']
+        }
+
+    def get_state(self):
+        with self.lock:
+            return {mid: self.describe_channel(channel) for mid, channel in self.channels.items()}
+
+    def stop(self):
+        """Apaga todos los LED"""
+        with self.lock:
+            for channel in self.channels.values():
+                channel['pwm'].ChangeDutyCycle(0)
+                channel['duty'] = 0
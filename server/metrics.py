@@ -0,0 +1,186 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# Límites (segundos) de los histogramas de latencia, de 0.5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base de las métricas: una serie por combinación de etiquetas"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.lock = Lock()
+        self.series = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def expose(self):
+        with self.lock:
+            series = list(self.series.items())
+        return self.header() + [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+                                for labels, value in series]
+
+
+class Gauge(Metric):
+    """Valor instantáneo; con callback se calcula solo al exponer las métricas"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback  # devuelve {tupla de etiquetas: valor}
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.series[labels] = value
+
+    def expose(self):
+        if self.callback:
+            try:
+                series = list(self.callback().items())
+            except Exception as e:
+                print(f"Error calculando la métrica {self.name}: {e}")
+                series = []
+        else:
+            with self.lock:
+                series = list(self.series.items())
+        return self.header() + [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+                                for labels, value in series]
+
+
+class Histogram(Metric):
+    """Histograma de buckets fijos: observe() es una búsqueda binaria y dos sumas"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma]
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels):
+        return Timer(self, labels)
+
+    def expose(self):
+        with self.lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+        lines = self.header()
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, ('le', format_value(bound)))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Timer:
+    """Context manager que observa la duración del bloque en un histograma"""
+
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expuestas en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def expose(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+# Registro global y métricas compartidas por los módulos del servidor
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'microscope_http_requests_total', 'Peticiones HTTP atendidas', ('route', 'method', 'status'))
+http_latency = registry.histogram(
+    'microscope_http_request_seconds', 'Latencia de las peticiones HTTP', ('route', 'method'))
+grab_seconds = registry.histogram(
+    'microscope_grab_seconds', 'Duración de la lectura de un frame de la cámara', ('camera',))
+encode_seconds = registry.histogram(
+    'microscope_encode_seconds', 'Duración de la codificación de un frame', ('camera', 'format'))
+write_seconds = registry.histogram(
+    'microscope_write_seconds', 'Duración de la escritura de una imagen en disco', ('camera',))
+lock_wait_seconds = registry.histogram(
+    'microscope_camera_lock_wait_seconds', 'Espera para adquirir el lock de una cámara', ('camera',))
+frames_dropped = registry.counter(
+    'microscope_frames_dropped_total', 'Frames descartados', ('camera', 'reason'))
+sensor_read_failures = registry.counter(
+    'microscope_sensor_read_failures_total', 'Lecturas fallidas del sensor DHT11', ('sensor',))
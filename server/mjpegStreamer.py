@@ -0,0 +1,152 @@
+import cv2
+import time
+import asyncio
+from threading import Thread, Condition, Event, Lock
+from metrics import encode_seconds, frames_dropped
+
+BOUNDARY = 'frame'
+
+
+class MjpegStreamer:
+    """Codifica cada frame una sola vez y lo reparte entre todos los espectadores"""
+
+    def __init__(self, name, grabber, quality=80):
+        self.name = name
+        self.grabber = grabber
+        self.quality = quality
+
+        # Último frame codificado (secuencia, bytes JPEG)
+        self.sequence = 0
+        self.jpeg = None
+        self.condition = Condition()
+
+        self.viewers = 0
+        self.dropped_frames = 0
+        self.closed = False  # True cuando la cámara se desconecta
+        self.viewers_lock = Lock()
+        self.async_listeners = set()  # (bucle asyncio, asyncio.Event) de los espectadores asíncronos
+        self.stop_event = Event()
+        self.thread = None
+
+    def run_loop(self):
+        """Codifica los frames nuevos mientras haya espectadores"""
+        last_sequence = 0
+        while True:
+            if self.stop_event.is_set():
+                # Un espectador pudo llegar mientras se esperaba el frame: solo se
+                # termina si sigue sin haber ninguno (add_viewer ve thread = None)
+                with self.viewers_lock:
+                    if self.viewers == 0 or self.closed:
+                        self.thread = None
+                        return
+                    self.stop_event.clear()
+            latest = self.grabber.wait_next(last_sequence, timeout=1.0)
+            if latest is None:
+                self.stop_event.wait(0.1)
+                continue
+            last_sequence, _, frame = latest
+
+            start = time.perf_counter()
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            encode_seconds.observe(time.perf_counter() - start, self.name, 'stream')
+            if not ok:
+                continue
+
+            with self.condition:
+                self.sequence = last_sequence
+                self.jpeg = buffer.tobytes()
+                self.condition.notify_all()
+            for loop, event in list(self.async_listeners):
+                loop.call_soon_threadsafe(event.set)
+
+    def add_viewer(self):
+        """Registra un espectador y arranca el codificador si es el primero"""
+        with self.viewers_lock:
+            self.viewers += 1
+            # Siempre se limpia: el codificador puede seguir vivo tras el último remove_viewer
+            self.stop_event.clear()
+            if self.thread is None:
+                self.thread = Thread(target=self.run_loop, name=f"mjpeg-{self.name}", daemon=True)
+                self.thread.start()
+
+    def remove_viewer(self):
+        """Elimina un espectador y detiene el codificador si no queda ninguno"""
+        with self.viewers_lock:
+            self.viewers -= 1
+            if self.viewers <= 0:
+                self.viewers = 0
+                self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def wait_frame(self, after_sequence, timeout=2.0):
+        """Devuelve el JPEG más reciente posterior a after_sequence (o None)"""
+        with self.condition:
+            if self.sequence <= after_sequence:
+                self.condition.wait(timeout)
+            if self.sequence <= after_sequence or self.jpeg is None:
+                return None
+            return self.sequence, self.jpeg
+
+    def multipart_chunk(self, sequence, jpeg, last_sequence):
+        """Parte multipart de un frame; cuenta los frames que el espectador se saltó"""
+        # Un cliente lento salta directamente al frame más reciente
+        if last_sequence and sequence > last_sequence + 1:
+            self.dropped_frames += sequence - last_sequence - 1
+            frames_dropped.inc(self.name, 'slow_viewer', amount=sequence - last_sequence - 1)
+        return (
+            f"--{BOUNDARY}\r\n"
+            f"Content-Type: image/jpeg\r\n"
+            f"Content-Length: {len(jpeg)}\r\n\r\n"
+        ).encode() + jpeg + b"\r\n"
+    
+    def frames(self):
+        """Generador multipart/x-mixed-replace para un espectador"""
+        self.add_viewer()
+        try:
+            last_sequence = 0
+            while not self.closed:
+                latest = self.wait_frame(last_sequence)
+                if latest is None:
+                    continue
+                sequence, jpeg = latest
+                yield self.multipart_chunk(sequence, jpeg, last_sequence)
+                last_sequence = sequence
+        finally:
+            self.remove_viewer()
+    
+    async def async_frames(self):
+        """Versión asíncrona de frames(): espera en el bucle de eventos sin ocupar un hilo"""
+        listener = (asyncio.get_running_loop(), asyncio.Event())
+        self.async_listeners.add(listener)
+        self.add_viewer()
+        try:
+            last_sequence = 0
+            while not self.closed:
+                try:
+                    await asyncio.wait_for(listener[1].wait(), 2.0)
+                except asyncio.TimeoutError:
+                    continue
+                listener[1].clear()
+                with self.condition:
+                    sequence, jpeg = self.sequence, self.jpeg
+                if sequence <= last_sequence or jpeg is None:
+                    continue
+                yield self.multipart_chunk(sequence, jpeg, last_sequence)
+                last_sequence = sequence
+        finally:
+            self.async_listeners.discard(listener)
+            self.remove_viewer()
+
+    def stop(self):
+        """Detiene el codificador y cierra las transmisiones abiertas"""
+        self.closed = True
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        for loop, event in list(self.async_listeners):
+            loop.call_soon_threadsafe(event.set)
+        with self.viewers_lock:
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout=2.0)
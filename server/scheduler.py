@@ -0,0 +1,200 @@
+import time
+import math
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Condition
+
+
+class Timer:
+    """Temporizador de un solo disparo"""
+
+    __slots__ = ('deadline', 'callback', 'cancelled')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class PeriodicJob:
+    """Trabajo periódico sin deriva: la ejecución k ocurre en origen + fase + k * periodo"""
+
+    def __init__(self, scheduler, name, period, callback, phase=0.0, blocking=False, origin=None):
+        if period <= 0:
+            raise ValueError("El periodo debe ser positivo")
+        self.scheduler = scheduler
+        self.name = name
+        self.period = period
+        self.phase = phase
+        self.callback = callback  # callback(instante programado)
+        self.blocking = blocking  # True: se ejecuta en el pool para no frenar el planificador
+        self.origin = time.monotonic() if origin is None else origin
+        self.slot = 0
+        self.runs = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.max_lateness = 0.0
+        self.running = False  # ejecución bloqueante en curso
+        self.timer = None
+        self.cancelled = False
+
+    def due_time(self):
+        return self.origin + self.phase + self.slot * self.period
+
+    def schedule_next(self):
+        # Saltar los periodos ya vencidos (p. ej. tras suspender el sistema) sin acumular retraso
+        behind = math.floor((time.monotonic() - self.due_time()) / self.period)
+        if behind > 0:
+            self.skipped += behind
+            self.slot += behind
+        self.timer = self.scheduler.call_at(self.due_time(), self.fire)
+
+    def fire(self):
+        if self.cancelled:
+            return
+        due = self.due_time()
+        self.max_lateness = max(self.max_lateness, time.monotonic() - due)
+        self.slot += 1
+        self.schedule_next()
+
+        if not self.blocking:
+            self.runs += 1
+            self.callback(due)
+        elif self.running:
+            # La ejecución anterior aún no terminó: no se encolan ejecuciones atrasadas
+            self.overruns += 1
+        else:
+            self.running = True
+            self.runs += 1
+            self.scheduler.executor.submit(self.run_blocking, due)
+
+    def run_blocking(self, due):
+        try:
+            self.callback(due)
+        except Exception as e:
+            print(f"Error en la tarea {self.name}: {e}")
+        finally:
+            self.running = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.timer is not None:
+            self.timer.cancel()
+
+    def get_status(self):
+        return {
+            'name': self.name,
+            'period': self.period,
+            'phase': self.phase,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'overruns': self.overruns,
+            'max_lateness': round(self.max_lateness, 6),
+            'next_run_in': round(self.due_time() - time.monotonic(), 3)
+        }
+
+
+class Scheduler:
+    """Planificador de un único hilo sobre el reloj monotónico.
+
+    Los temporizadores se guardan en un montículo ordenado por vencimiento
+    (inserción O(log n)); el hilo duerme hasta el primero en lugar de
+    despertar a intervalos fijos. Los cancelados se descartan al llegar a la
+    cima. Las tareas bloqueantes (lectura de sensores) se ejecutan en un pool
+    aparte.
+    """
+
+    def __init__(self, workers=2):
+        self.heap = []  # (vencimiento, orden de inserción, Timer)
+        self.counter = itertools.count()  # desempate: a igual vencimiento, por orden de inserción
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+        self.jobs = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler-job')
+
+    def call_at(self, deadline, callback):
+        """Programa callback() en el instante monotónico deadline"""
+        timer = Timer(deadline, callback)
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.counter), timer))
+            if self.heap[0][2] is timer:
+                self.condition.notify()  # el nuevo es el más próximo: recalcular la espera
+        return timer
+
+    def call_later(self, delay, callback):
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def add_job(self, name, period, callback, phase=0.0, blocking=False, origin=None):
+        """Añade (o reemplaza) una tarea periódica"""
+        self.remove_job(name)
+        job = PeriodicJob(self, name, period, callback, phase, blocking, origin)
+        self.jobs[name] = job
+        job.schedule_next()
+        return job
+
+    def remove_job(self, name):
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            job.cancel()
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = Thread(target=self.run_loop, name='scheduler', daemon=True)
+        self.thread.start()
+
+    def next_deadline(self):
+        """Próximo vencimiento (con el lock tomado); None si no hay temporizadores"""
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def run_loop(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    deadline = self.next_deadline()
+                    now = time.monotonic()
+                    if deadline is not None and deadline <= now:
+                        break
+                    self.condition.wait(None if deadline is None else deadline - now)
+                if not self.running:
+                    return
+                due = self.pop_due(time.monotonic())
+
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.callback()
+                except Exception as e:
+                    print(f"Error en temporizador del planificador: {e}")
+
+    def pop_due(self, now):
+        """Extrae, en orden, los temporizadores vencidos"""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            timer = heapq.heappop(self.heap)[2]
+            if not timer.cancelled:
+                due.append(timer)
+        return due
+
+    def get_status(self):
+        return {name: job.get_status() for name, job in list(self.jobs.items())}
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        for job in list(self.jobs.values()):
+            job.cancel()
+        self.executor.shutdown(wait=False)
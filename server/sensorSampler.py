@@ -0,0 +1,110 @@
+import time
+from collections import deque
+from statistics import median
+from threading import Thread, Event, Lock
+
+
+class SensorSampler:
+    """Lee el DHT11 a un ritmo seguro en segundo plano y publica el último valor válido.
+
+    Las lecturas fallidas se reintentan respetando el intervalo mínimo del
+    sensor y los saltos bruscos respecto a la mediana reciente se descartan
+    como lecturas erróneas, salvo que se repitan (cambio real).
+    """
+
+    # Desviación máxima respecto a la mediana reciente antes de considerar un valor atípico
+    MAX_DEVIATION = {'temperature': 5.0, 'humidity': 15.0}
+
+    def __init__(self, read, interval=3.0, retry_delay=2.0, max_retries=3, window=5, max_outliers=3,
+                 on_reading=None):
+        self.read = read  # devuelve {'temperature', 'humidity', 'timestamp'} o None
+        self.on_reading = on_reading  # recibe cada lectura aceptada (p. ej. para guardarla)
+        self.interval = interval
+        self.retry_delay = retry_delay  # el DHT11 no admite lecturas más rápidas
+        self.max_retries = max_retries
+        self.max_outliers = max_outliers  # atípicos seguidos que se aceptan como cambio real
+        self.recent = deque(maxlen=window)
+
+        self.lock = Lock()
+        self.latest_data = None
+        self.latest_time = None  # time.monotonic() de la última lectura válida
+        self.outliers = 0
+        self.stats = {'reads': 0, 'failures': 0, 'outliers': 0}
+
+        self.stop_event = Event()
+        self.thread = Thread(target=self.run_loop, name='sensor-sampler', daemon=True)
+        self.thread.start()
+
+    def read_with_retry(self):
+        """Intenta leer el sensor hasta max_retries veces; devuelve la lectura o None"""
+        for attempt in range(self.max_retries):
+            if attempt and self.stop_event.wait(self.retry_delay):
+                return None
+            try:
+                data = self.read()
+            except Exception as e:
+                # Un error inesperado del controlador no debe detener el muestreo
+                print(f"Error leyendo el sensor: {e}")
+                data = None
+            with self.lock:
+                self.stats['reads'] += 1
+                if data is None:
+                    self.stats['failures'] += 1
+            if data is not None:
+                return data
+        return None
+
+    def is_outlier(self, data):
+        if len(self.recent) < 3:
+            return False
+        for field, limit in self.MAX_DEVIATION.items():
+            if abs(data[field] - median(r[field] for r in self.recent)) > limit:
+                return True
+        return False
+
+    def accept(self, data):
+        """Filtra valores atípicos y publica la lectura si es válida"""
+        if self.is_outlier(data):
+            self.outliers += 1
+            with self.lock:
+                self.stats['outliers'] += 1
+            if self.outliers < self.max_outliers:
+                return
+            # Varias lecturas seguidas coinciden: el cambio es real, reiniciar la ventana
+            self.recent.clear()
+        self.outliers = 0
+        self.recent.append(data)
+        with self.lock:
+            self.latest_data = data
+            self.latest_time = time.monotonic()
+        if self.on_reading:
+            try:
+                self.on_reading(data)
+            except Exception as e:
+                print(f"Error guardando lectura del sensor: {e}")
+
+    def run_loop(self):
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            data = self.read_with_retry()
+            if data is not None:
+                self.accept(data)
+            next_time = max(next_time + self.interval, time.monotonic() + self.retry_delay)
+            self.stop_event.wait(next_time - time.monotonic())
+
+    def latest(self):
+        """Última lectura válida con su antigüedad en segundos, o None"""
+        with self.lock:
+            if self.latest_data is None:
+                return None
+            data = dict(self.latest_data)
+            data['age'] = time.monotonic() - self.latest_time
+        return data
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5.0)
@@ -0,0 +1,183 @@
+import os
+import time
+import calendar
+import numpy as np
+from threading import Lock
+
+# Carpeta de los segmentos diarios y días que se conservan
+SENSOR_DATA_FOLDER = os.environ.get('SENSOR_DATA_FOLDER', 'sensor_data')
+SENSOR_RETENTION_DAYS = int(os.environ.get('SENSOR_RETENTION_DAYS', 90))
+
+# Registro de tamaño fijo: instante (epoch), temperatura y humedad
+RECORD = np.dtype([('time', '<f8'), ('temperature', '<f4'), ('humidity', '<f4')])
+SEGMENT_SECONDS = 86400
+FIELDS = ('temperature', 'humidity')
+
+
+class SensorStore:
+    """Serie temporal binaria de solo anexado, en un segmento por día (UTC).
+
+    Cada segmento es una secuencia de registros de 16 bytes en orden
+    cronológico: el nombre del archivo indexa el día y dentro de él se busca
+    el rango por bisección, sin recorrer ni interpretar texto.
+
+    La Raspberry Pi no tiene reloj de tiempo real y su hora puede retroceder
+    al sincronizar con NTP. Un registro anterior al último del segmento lo
+    marca como desordenado (archivo .unsorted): se ordena al leerlo y se
+    reescribe ordenado al cambiar de segmento o al cerrar.
+    """
+
+    def __init__(self, folder=SENSOR_DATA_FOLDER, retention_days=SENSOR_RETENTION_DAYS):
+        self.folder = folder
+        self.retention_days = retention_days
+        self.lock = Lock()
+        self.file = None
+        self.segment = None  # día (epoch // 86400) del segmento abierto
+        self.last_time = None  # último instante anexado al segmento abierto
+        self.out_of_order = 0
+        os.makedirs(folder, exist_ok=True)
+        self.apply_retention()
+
+    def segment_path(self, day):
+        return os.path.join(self.folder, time.strftime("sensor_%Y%m%d.bin", time.gmtime(day * SEGMENT_SECONDS)))
+
+    def unsorted_marker(self, day):
+        return self.segment_path(day)[:-4] + '.unsorted'
+
+    def segment_days(self):
+        """Días con segmento en disco, ordenados"""
+        days = []
+        for name in os.listdir(self.folder):
+            if name.startswith('sensor_') and name.endswith('.bin'):
+                try:
+                    day = calendar.timegm(time.strptime(name[7:15], "%Y%m%d")) // SEGMENT_SECONDS
+                except ValueError:
+                    continue
+                days.append(day)
+        return sorted(days)
+
+    def append(self, timestamp, temperature, humidity):
+        """Anexa una lectura; abre un segmento nuevo al cambiar de día"""
+        record = np.array([(timestamp, temperature, humidity)], dtype=RECORD).tobytes()
+        day = int(timestamp // SEGMENT_SECONDS)
+        with self.lock:
+            if day != self.segment:
+                self.rotate(day)
+            if self.last_time is not None and timestamp < self.last_time:
+                # El reloj retrocedió: se conserva la lectura y se marca el segmento
+                self.out_of_order += 1
+                if not os.path.exists(self.unsorted_marker(day)):
+                    print(f"Lectura de sensores fuera de orden ({timestamp} < {self.last_time}), "
+                          f"se reordenará el segmento {self.segment_path(day)}")
+                    open(self.unsorted_marker(day), 'w').close()
+            self.file.write(record)
+            self.file.flush()
+            self.last_time = max(timestamp, self.last_time or timestamp)
+
+    def rotate(self, day):
+        self.close_segment()
+        path = self.segment_path(day)
+        self.file = open(path, 'ab')
+        # Descartar un registro incompleto si el proceso terminó a mitad de una escritura
+        extra = self.file.tell() % RECORD.itemsize
+        if extra:
+            self.file.truncate(self.file.tell() - extra)
+        self.segment = day
+        self.last_time = None
+        count = self.file.tell() // RECORD.itemsize
+        if count:
+            records = np.memmap(path, dtype=RECORD, mode='r', shape=(count,))
+            self.last_time = float(records['time'].max() if os.path.exists(self.unsorted_marker(day))
+                                   else records['time'][-1])
+        self.apply_retention()
+
+    def close_segment(self):
+        """Cierra el segmento abierto y lo reescribe ordenado si quedó desordenado"""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if os.path.exists(self.unsorted_marker(self.segment)):
+            self.sort_segment(self.segment)
+        self.segment = None
+        self.last_time = None
+
+    def sort_segment(self, day):
+        """Reescribe un segmento ordenado por instante (archivo temporal + os.replace)"""
+        path = self.segment_path(day)
+        try:
+            records = np.fromfile(path, dtype=RECORD, count=os.path.getsize(path) // RECORD.itemsize)
+            records = records[np.argsort(records['time'], kind='stable')]
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            os.remove(self.unsorted_marker(day))
+        except OSError as e:
+            print(f"Error reordenando segmento de sensores {path}: {e}")
+
+    def apply_retention(self):
+        """Elimina los segmentos más antiguos que retention_days"""
+        if not self.retention_days:
+            return
+        oldest = int(time.time() // SEGMENT_SECONDS) - self.retention_days
+        for day in self.segment_days():
+            if day >= oldest:
+                break
+            try:
+                os.remove(self.segment_path(day))
+                if os.path.exists(self.unsorted_marker(day)):
+                    os.remove(self.unsorted_marker(day))
+                print(f"Segmento de sensores eliminado por retención: {self.segment_path(day)}")
+            except OSError as e:
+                print(f"Error eliminando segmento de sensores: {e}")
+
+    def read_range(self, start, end):
+        """Registros con start <= time < end como array estructurado"""
+        chunks = []
+        for day in range(int(start // SEGMENT_SECONDS), int(end // SEGMENT_SECONDS) + 1):
+            path = self.segment_path(day)
+            try:
+                with self.lock:
+                    count = os.path.getsize(path) // RECORD.itemsize
+                    unsorted = os.path.exists(self.unsorted_marker(day))
+                # memmap: solo se leen del disco las páginas del tramo pedido
+                records = np.memmap(path, dtype=RECORD, mode='r', shape=(count,))
+            except (FileNotFoundError, ValueError):
+                continue  # segmento inexistente o vacío
+            if unsorted:
+                records = records[np.argsort(records['time'], kind='stable')]
+            times = records['time']
+            chunks.append(records[np.searchsorted(times, start, 'left'):np.searchsorted(times, end, 'left')])
+        if not chunks:
+            return np.empty(0, dtype=RECORD)
+        return np.concatenate(chunks)
+
+    def aggregate(self, start, end, step):
+        """Mínimo, media y máximo por intervalo de `step` segundos entre start y end"""
+        records = self.read_range(start, end)
+        result = {'time': [], 'count': []}
+        for field in FIELDS:
+            result[field] = {'min': [], 'mean': [], 'max': []}
+        if len(records) == 0:
+            return result
+
+        # Los registros están ordenados, así que cada intervalo es un tramo contiguo
+        buckets = ((records['time'] - start) // step).astype(np.int64)
+        _, first, counts = np.unique(buckets, return_index=True, return_counts=True)
+        result['time'] = (start + buckets[first] * step).tolist()
+        result['count'] = counts.tolist()
+        for field in FIELDS:
+            values = records[field].astype(np.float64)
+            result[field] = {
+                'min': np.minimum.reduceat(values, first).round(2).tolist(),
+                'mean': (np.add.reduceat(values, first) / counts).round(2).tolist(),
+                'max': np.maximum.reduceat(values, first).round(2).tolist()
+            }
+        return result
+
+    def close(self):
+        with self.lock:
+            self.close_segment()
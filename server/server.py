@@ -1,45 +1,121 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, Response, g
 import json
 import os
+import hashlib
 import cv2
 from datetime import datetime
 import threading
+import itertools
 import time
+import io
+import re
+import asyncio
+import zipfile
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from flask_cors import CORS
-import glob
 import psutil
 from SensorController import SensorController
+from frameGrabber import FrameGrabber
+from mjpegStreamer import MjpegStreamer, BOUNDARY
+from imageWriter import ImageWriter
+from frameCache import EncodedFrameCache
+from imageStats import compute_histograms, histogram_stats
+from timelapse import TimelapseEngine
+from cameraDevices import device_number
+from cameraWatcher import CameraWatcher, CameraIdMap
+from cameraSources import OpenCVSource, SyntheticSource, ReplaySource
+from asyncServing import AsyncServer
+from systemStats import SystemStatsSampler
+from sensorSampler import SensorSampler
+from eventBus import EventBus, format_event
+from ledDriver import LedDriver
+from metrics import registry, http_requests, http_latency, encode_seconds, lock_wait_seconds
 
 app = Flask(__name__)
 CORS(app)
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Se etiqueta por la regla de la ruta (no por la URL) para acotar las series
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_latency.observe(time.perf_counter() - g.request_start, route, request.method)
+    http_requests.inc(route, request.method, str(response.status_code))
+    return response
+
 # Declaración global al inicio del archivo
 global IMAGE_FOLDER
 IMAGE_FOLDER = 'microscope_captures'
 
 # Inicialización de componentes
 controller = SensorController()
-cameras = {}  # Diccionario para múltiples cámaras
-camera_lock = threading.Lock()
+# Un canal PWM por microscopio; el pin del LED original reutiliza el PWM de SensorController
+led_driver = LedDriver(controller.hardware, existing={controller.led_pin: controller.pwm})
+# Cambios de estado publicados a los clientes por /events (Server-Sent Events)
+event_bus = EventBus()
+EVENT_KEEPALIVE = 15.0  # segundos entre comentarios de keep-alive
+SYSTEM_EVENT_INTERVAL = float(os.environ.get('SYSTEM_EVENT_INTERVAL', 5.0))
+
+def record_sensor_reading(data):
+    """Guarda una lectura aceptada del sensor y la publica"""
+    controller.sensor_store.append(time.time(), data['temperature'], data['humidity'])
+    event_bus.publish('sensor', data)
+
+# El DHT11 se lee solo desde este hilo; /get_data responde con la última lectura válida
+sensor_sampler = SensorSampler(
+    controller.read_sensor,
+    interval=float(os.environ.get('SENSOR_INTERVAL', 3.0)),
+    on_reading=record_sensor_reading
+)
+cameras = {}  # Diccionario para múltiples cámaras (cada una con su propio lock)
+FRESH_FRAME_TIMEOUT = 2.0  # segundos de espera para ?fresh=1
+CAMERA_OPEN_TIMEOUT = 5.0  # espera máxima del primer frame de una cámara recién abierta
+CAMERA_WARMUP = os.environ.get('CAMERA_WARMUP', '1') == '1'  # abrir cámaras en segundo plano al iniciar
+STREAM_JPEG_QUALITY = 80  # calidad JPEG de la transmisión en vivo
+
+# Fuente de frames: v4l2 (microscopios USB), synthetic (frames generados) o replay (imágenes/video)
+CAMERA_SOURCE = os.environ.get('CAMERA_SOURCE', 'v4l2')
+CAMERA_WIDTH, CAMERA_HEIGHT = (int(v) for v in os.environ.get('CAMERA_RESOLUTION', '1280x720').split('x'))
+CAMERA_FPS = float(os.environ.get('CAMERA_FPS', 15))
+SYNTHETIC_CAMERAS = int(os.environ.get('SYNTHETIC_CAMERAS', 2))
+REPLAY_PATHS = [p for p in os.environ.get('REPLAY_PATHS', '').split(os.pathsep) if p]  # una ruta por microscopio
+capture_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='capture')
+
+# Caché LRU de frames codificados (clave: microscopio, secuencia, formato, calidad, tamaño)
+frame_cache = EncodedFrameCache(max_bytes=int(os.environ.get('FRAME_CACHE_BYTES', 32 * 1024 * 1024)))
+
+# Formatos de salida soportados: extensión, tipo MIME, parámetro de calidad y valor por defecto
+IMAGE_FORMATS = {
+    'jpg': ('.jpg', 'image/jpeg', cv2.IMWRITE_JPEG_QUALITY, 95),
+    'png': ('.png', 'image/png', cv2.IMWRITE_PNG_COMPRESSION, 3)
+}
+
+# Máximo de intervalos devueltos por /sensor_history
+SENSOR_HISTORY_MAX_BUCKETS = 2000
+
+# Preajuste de miniatura para vistas previas (ancho, alto, calidad JPEG)
+THUMBNAIL_PRESET = (320, 180, 70)
+
+# Escritura de capturas en segundo plano (política de fsync: never, batch o always)
+image_writer = ImageWriter(
+    max_queue=int(os.environ.get('CAPTURE_WRITER_QUEUE', 64)),
+    batch_size=int(os.environ.get('CAPTURE_WRITER_BATCH', 8)),
+    fsync_policy=os.environ.get('CAPTURE_FSYNC_POLICY', 'batch')
+)
 
 # Crear carpeta para imágenes si no existe
 os.makedirs(IMAGE_FOLDER, exist_ok=True)
 
-def detect_microscopes():
-    """Detecta todos los dispositivos de video conectados"""
-    devices = glob.glob('/dev/video*')
-    return sorted(devices)  # Ordenar para consistencia
-
 def init_camera(camera_index=0):
     """Inicializa una cámara específica"""
     try:
-        cap = cv2.VideoCapture(camera_index)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 15)
-        
-        time.sleep(1)  # Pausa para inicialización
+        cap = OpenCVSource(camera_index, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS)
         
+        # Sin pausa fija: el hilo de captura descarta lecturas fallidas hasta el primer frame
         if not cap.isOpened():
             print(f"Error: No se pudo abrir la cámara {camera_index}")
             return None
@@ -50,6 +126,61 @@ def init_camera(camera_index=0):
         print(f"Error al inicializar cámara {camera_index}: {str(e)}")
         return None
 
+def init_virtual_camera(index):
+    """Crea la fuente sintética o de reproducción número index"""
+    if CAMERA_SOURCE == 'synthetic':
+        return SyntheticSource(CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, seed=index)
+    source = ReplaySource(REPLAY_PATHS[index], fps=CAMERA_FPS)
+    if not source.isOpened():
+        print(f"Error: No se pudo abrir {REPLAY_PATHS[index]}")
+        return None
+    return source
+
+def encode_frame(frame, fmt='jpg', quality=None, camera=''):
+    """Codifica un frame en memoria; devuelve los bytes o None"""
+    extension, _, param, default_quality = IMAGE_FORMATS[fmt]
+    quality = default_quality if quality is None else quality
+    with encode_seconds.time(camera, fmt):
+        ok, buffer = cv2.imencode(extension, frame, [param, quality])
+    return buffer.tobytes() if ok else None
+
+def parse_roi(value):
+    """Convierte 'x,y,w,h' en una tupla de enteros"""
+    try:
+        x, y, w, h = (int(v) for v in value.split(','))
+    except ValueError:
+        raise ValueError("roi debe tener el formato x,y,w,h")
+    if x < 0 or y < 0 or w <= 0 or h <= 0:
+        raise ValueError("roi fuera de rango")
+    return x, y, w, h
+
+def transform_frame(frame, roi=None, width=None, height=None):
+    """Recorta la región de interés y después reduce (nunca amplía) el tamaño"""
+    if roi is not None:
+        x, y, w, h = roi
+        frame_h, frame_w = frame.shape[:2]
+        if x + w > frame_w or y + h > frame_h:
+            raise ValueError("roi fuera de los límites de la imagen")
+        frame = frame[y:y + h, x:x + w]
+    
+    if width or height:
+        frame_h, frame_w = frame.shape[:2]
+        # Conservar la relación de aspecto si solo se indica una dimensión
+        if not width:
+            width = max(1, round(frame_w * height / frame_h))
+        elif not height:
+            height = max(1, round(frame_h * width / frame_w))
+        # Solo se reduce: un tamaño mayor que el frame se ajusta a él conservando la
+        # proporción pedida (width=50000&height=50000 reservaría GB de memoria)
+        scale = min(1.0, frame_w / width, frame_h / height)
+        if scale < 1.0:
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        if (width, height) != (frame_w, frame_h):
+            shrinking = width < frame_w and height < frame_h
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+            frame = cv2.resize(frame, (width, height), interpolation=interpolation)
+    return frame
+
 def get_system_stats():
     """Obtiene estadísticas del sistema"""
     return {
@@ -67,29 +198,140 @@ def get_cpu_temp():
     except:
         return 0.0
 
+last_system_event = {'time': 0.0, 'values': None}
+
+def publish_system_stats(sample):
+    """Publica las estadísticas como mucho cada SYSTEM_EVENT_INTERVAL y solo si cambiaron"""
+    now = time.monotonic()
+    if now - last_system_event['time'] < SYSTEM_EVENT_INTERVAL:
+        return
+    values = {
+        'cpu_usage': round(sample['cpu'], 1),
+        'memory_usage': round(sample['ram'], 1),
+        'storage_usage': round(sample['storage'], 1),
+        'cpu_temp': round(sample['temp'], 1)
+    }
+    if values != last_system_event['values']:
+        last_system_event.update(time=now, values=values)
+        event_bus.publish('system', values)
+
+# Muestreo periódico en segundo plano; los endpoints leen la última muestra
+system_stats = SystemStatsSampler(
+    get_system_stats,
+    interval=float(os.environ.get('SYSTEM_STATS_INTERVAL', 1.0)),
+    capacity=int(os.environ.get('SYSTEM_STATS_HISTORY', 3600)),
+    on_sample=publish_system_stats
+)
+
+camera_generations = itertools.count(1)
+
+def register_camera(microscope_id, device, opener):
+    """Registra una cámara; opener() la abre de forma diferida en su hilo de captura"""
+    lock = threading.Lock()
+    grabber = FrameGrabber(microscope_id, lock=lock, opener=opener)
+    cameras[microscope_id] = {
+        'device': device,
+        'lock': lock,
+        'grabber': grabber,
+        'generation': next(camera_generations),  # la secuencia de frames vuelve a 1 con cada FrameGrabber
+        'streamer': MjpegStreamer(microscope_id, grabber, quality=STREAM_JPEG_QUALITY),
+        'config': {
+            'led_on': False,
+            'led_intensity': 50,
+            'resolution': f'{CAMERA_WIDTH}x{CAMERA_HEIGHT}'
+        }
+    }
+    cameras[microscope_id]['config']['led_pin'] = led_driver.attach(microscope_id, intensity=50)
+    event_bus.publish('camera', {'microscope_id': microscope_id, 'connected': True,
+                                 'config': cameras[microscope_id]['config']})
+
+def get_grabber(microscope_id):
+    """Devuelve el hilo de captura de una cámara, abriéndola en el primer uso"""
+    grabber = cameras[microscope_id]['grabber']
+    grabber.start()
+    return grabber
+
+def get_frame(microscope_id, fresh=False):
+    """Último frame del buffer, o el siguiente si fresh=True (None si no llega a tiempo)"""
+    grabber = get_grabber(microscope_id)
+    timeout = FRESH_FRAME_TIMEOUT if grabber.ready else CAMERA_OPEN_TIMEOUT
+    if fresh:
+        return grabber.wait_next(timeout=timeout)
+    return grabber.latest() or grabber.wait_next(timeout=timeout)
+
+def add_camera(device):
+    """Alta de una cámara conectada (al iniciar o en caliente)"""
+    microscope_id = camera_ids.get_id(device)
+    register_camera(microscope_id, device, lambda: init_camera(device_number(device)))
+    if CAMERA_WARMUP:
+        # Cada hilo abre su cámara en paralelo sin bloquear el arranque
+        get_grabber(microscope_id)
+
+def remove_camera(device):
+    """Baja de una cámara desconectada: detiene sus hilos y libera el dispositivo"""
+    for microscope_id, data in list(cameras.items()):
+        if data['device'] != device:
+            continue
+        timelapse.stop(microscope_id)
+        cameras.pop(microscope_id, None)
+        data['streamer'].stop()
+        data['grabber'].release()
+        led_driver.detach(microscope_id)
+        frame_cache.discard(microscope_id)
+        event_bus.publish('camera', {'microscope_id': microscope_id, 'connected': False})
+
+# IDs estables por puerto físico y vigilancia de conexiones en caliente
+camera_ids = CameraIdMap()
+camera_watcher = CameraWatcher(add_camera, remove_camera)
+
 # Inicializar todas las cámaras al iniciar el servidor
 def initialize_all_cameras():
-    global cameras
-    devices = detect_microscopes()
+    if CAMERA_SOURCE == 'v4l2':
+        camera_watcher.start()
+        return
+    
+    if CAMERA_SOURCE == 'synthetic':
+        devices = [f"synthetic:{i}" for i in range(SYNTHETIC_CAMERAS)]
+    elif CAMERA_SOURCE == 'replay':
+        devices = [f"replay:{path}" for path in REPLAY_PATHS]
+    else:
+        raise ValueError(f"CAMERA_SOURCE no válido: {CAMERA_SOURCE}")
+    
     for i, device in enumerate(devices):
-        cap = init_camera(i)
-        if cap:
-            cameras[f"microscope_{i+1}"] = {
-                'device': device,
-                'capture': cap,
-                'config': {
-                    'led_on': False,
-                    'led_intensity': 50,
-                    'resolution': '1280x720'
-                }
-            }
+        microscope_id = f"microscope_{i+1}"
+        register_camera(microscope_id, device, lambda i=i: init_virtual_camera(i))
+        if CAMERA_WARMUP:
+            get_grabber(microscope_id)
 
 initialize_all_cameras()
 
+# Time-lapse: LED encendido solo durante la captura
+def strobe_led(microscope_id, on, intensity):
+    """Enciende el LED para una toma o restaura el estado configurado"""
+    led_driver.strobe(microscope_id, on, intensity)
+
+def grab_fresh_frame(microscope_id):
+    """Devuelve un frame capturado después de la llamada (o None)"""
+    if microscope_id not in cameras:
+        return None
+    return get_frame(microscope_id, fresh=True)
+
+def persist_frame(microscope_id, frame_time, frame):
+    """Codifica y encola una captura del time-lapse para guardarla"""
+    data = encode_frame(frame, camera=microscope_id)
+    if data is None:
+        raise RuntimeError('Error al codificar imagen')
+    timestamp = datetime.fromtimestamp(frame_time).strftime("%Y%m%d_%H%M%S")
+    filename = f"{microscope_id}_timelapse_{timestamp}.jpg"
+    if not image_writer.submit(os.path.join(IMAGE_FOLDER, filename), data, microscope_id):
+        raise RuntimeError('Cola de escritura llena')
+
+timelapse = TimelapseEngine(strobe_led, grab_fresh_frame, persist_frame)
+
 # Endpoints del sistema
 @app.route('/get_config', methods=['GET'])
 def get_config():
-    stats = get_system_stats()
+    stats = system_stats.latest() or get_system_stats()
     return jsonify({
         'interval': controller.interval,
         'led_intensity': controller.led_intensity,
@@ -101,6 +343,87 @@ def get_config():
         'cpu_temp': stats['temp']
     })
 
+def build_state():
+    """Estado completo: ajustes, sistema, sensor y configuración de cada microscopio"""
+    stats = system_stats.latest() or get_system_stats()
+    sensor = sensor_sampler.latest()
+    return {
+        'settings': {
+            'interval': controller.interval,
+            'led_intensity': controller.led_intensity,
+            'led_state': controller.led_state
+        },
+        'system': {
+            'camera_connected': len(cameras) > 0,
+            'cpu_usage': round(stats['cpu'], 1),
+            'memory_usage': round(stats['ram'], 1),
+            'storage_usage': round(stats['storage'], 1),
+            'cpu_temp': round(stats['temp'], 1)
+        },
+        'sensor': {
+            'temperature': sensor['temperature'],
+            'humidity': sensor['humidity'],
+            'timestamp': sensor['timestamp']
+        } if sensor else None,
+        'microscopes': [
+            {
+                'id': mid,
+                'connected': True,
+                'resolution': data['config']['resolution'],
+                'config': data['config']
+            }
+            for mid, data in sorted(cameras.items())
+        ]
+    }
+
+# Pasos de cuantización de la telemetría para calcular la versión de /state
+STATE_PERCENT_STEP = 5
+STATE_TEMP_STEP = 1
+
+def state_version(document):
+    """Hash de la parte estable del estado.
+    
+    La telemetría se remuestrea cada segundo y el sensor cada 3 s: con sus
+    valores exactos la versión cambiaría en casi cada sondeo. Se cuantiza el
+    uso de CPU, memoria y disco a STATE_PERCENT_STEP % y las temperaturas a
+    grados enteros, y no se incluye el instante de la lectura del sensor.
+    """
+    stable = dict(document)
+    system = document['system']
+    stable['system'] = dict(system, **{
+        key: round(system[key] / STATE_PERCENT_STEP) * STATE_PERCENT_STEP
+        for key in ('cpu_usage', 'memory_usage', 'storage_usage')
+    }, cpu_temp=round(system['cpu_temp'] / STATE_TEMP_STEP) * STATE_TEMP_STEP)
+    if document['sensor']:
+        stable['sensor'] = {key: document['sensor'][key] for key in ('temperature', 'humidity')}
+    return hashlib.sha1(json.dumps(stable, sort_keys=True).encode()).hexdigest()[:16]
+
+@app.route('/state', methods=['GET'])
+def state():
+    """Documento de estado versionado; If-None-Match con la versión actual devuelve 304"""
+    document = build_state()
+    # Con un 304 el cliente conserva valores de telemetría que difieren menos de un paso
+    version = state_version(document)
+    if request.if_none_match.contains(version):
+        response = Response(status=304)
+    else:
+        document['version'] = version
+        response = Response(json.dumps(document), mimetype='application/json')
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/system_history', methods=['GET'])
+def system_history():
+    """Histórico de CPU, RAM, almacenamiento y temperatura desde `since` (epoch)"""
+    since = request.args.get('since', type=float)
+    max_points = request.args.get('points', 300, type=int)
+    return jsonify({
+        'success': True,
+        'interval': system_stats.interval,
+        'history': system_stats.history(since, max(1, max_points))
+    })
+
 @app.route('/list_microscopes', methods=['GET'])
 def list_microscopes():
     microscope_list = [
@@ -109,7 +432,7 @@ def list_microscopes():
             'connected': True,
             'resolution': data['config']['resolution']
         } 
-        for mid, data in cameras.items()
+        for mid, data in list(cameras.items())
     ]
     return jsonify({
         'success': True,
@@ -135,18 +458,211 @@ def capture_image(microscope_id):
         return jsonify({'success': False, 'error': 'Microscopio no encontrado'}), 404
     
     try:
-        with camera_lock:
-            cap = cameras[microscope_id]['capture']
-            ret, frame = cap.read()
-            if not ret:
-                return jsonify({'success': False, 'error': 'Error al capturar imagen'})
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{microscope_id}_{timestamp}.jpg"
-            filepath = os.path.join(IMAGE_FOLDER, filename)
-            
-            cv2.imwrite(filepath, frame)
-            return send_file(filepath, mimetype='image/jpeg')
+        generation = cameras[microscope_id]['generation']
+        # fresh=1: esperar al siguiente frame en lugar de devolver el del buffer
+        latest = get_frame(microscope_id, fresh=request.args.get('fresh') == '1')
+        if latest is None:
+            return jsonify({'success': False, 'error': 'Error al capturar imagen'})
+        sequence, frame_time, frame = latest
+        
+        fmt = request.args.get('format', 'jpg').lower()
+        if fmt not in IMAGE_FORMATS:
+            return jsonify({'success': False, 'error': f'Formato no soportado: {fmt}'}), 400
+        quality = request.args.get('quality', type=int)
+        width = request.args.get('width', type=int)
+        height = request.args.get('height', type=int)
+        try:
+            roi = parse_roi(request.args['roi']) if 'roi' in request.args else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if 'thumb' in request.args:
+            width, height, thumb_quality = THUMBNAIL_PRESET
+            if quality is None and fmt == 'jpg':
+                quality = thumb_quality
+        if (width is not None and width <= 0) or (height is not None and height <= 0):
+            return jsonify({'success': False, 'error': 'Dimensiones no válidas'}), 400
+        size = (roi, width, height) if roi or width or height else None
+        
+        def encode():
+            # Solo se codifica una vez por frame y variante;
+            # únicamente las capturas a tamaño completo se guardan en disco
+            data = encode_frame(transform_frame(frame, roi, width, height), fmt, quality, microscope_id)
+            if data is not None and size is None:
+                timestamp = datetime.fromtimestamp(frame_time).strftime("%Y%m%d_%H%M%S")
+                filename = f"{microscope_id}_{timestamp}{IMAGE_FORMATS[fmt][0]}"
+                image_writer.submit(os.path.join(IMAGE_FOLDER, filename), data, microscope_id)
+            return data
+        
+        key = (microscope_id, generation, sequence, fmt, quality, size)
+        data = frame_cache.get_or_encode(key, encode)
+        if data is None:
+            return jsonify({'success': False, 'error': 'Error al codificar imagen'})
+        
+        response = Response(data, mimetype=IMAGE_FORMATS[fmt][1])
+        response.headers['X-Frame-Sequence'] = str(sequence)
+        response.headers['X-Frame-Timestamp'] = f"{frame_time:.6f}"
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/histogram/<microscope_id>', methods=['GET'])
+def histogram(microscope_id):
+    """Histogramas por canal y de luminancia con estadísticas calculadas en el servidor"""
+    if microscope_id not in cameras:
+        return jsonify({'success': False, 'error': 'Microscopio no encontrado'}), 404
+    
+    try:
+        latest = get_frame(microscope_id, fresh=request.args.get('fresh') == '1')
+        if latest is None:
+            return jsonify({'success': False, 'error': 'Error al capturar imagen'})
+        sequence, frame_time, frame = latest
+        
+        roi = parse_roi(request.args['roi']) if 'roi' in request.args else None
+        histograms = compute_histograms(transform_frame(frame, roi))
+        
+        return jsonify({
+            'success': True,
+            'sequence': sequence,
+            'timestamp': frame_time,
+            'histograms': {name: hist.tolist() for name, hist in histograms.items()},
+            'stats': {name: histogram_stats(hist) for name, hist in histograms.items()}
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/stream/<microscope_id>', methods=['GET'])
+def stream(microscope_id):
+    """Transmisión MJPEG en vivo compartida entre todos los espectadores"""
+    if microscope_id not in cameras:
+        return jsonify({'success': False, 'error': 'Microscopio no encontrado'}), 404
+    
+    get_grabber(microscope_id)
+    streamer = cameras[microscope_id]['streamer']
+    return Response(
+        streamer.frames(),
+        mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+async def async_stream(headers, match):
+    """Versión nativa de /stream para el modo asíncrono: no ocupa un hilo por espectador"""
+    microscope_id = match.group(1)
+    if microscope_id not in cameras:
+        return None  # la aplicación Flask responde el 404
+    get_grabber(microscope_id)
+    streamer = cameras[microscope_id]['streamer']
+    headers = [('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}'),
+               ('Cache-Control', 'no-cache')]
+    return '200 OK', headers, streamer.async_frames()
+
+@contextmanager
+def acquire_camera_lock(microscope_id, lock):
+    """Toma el lock de una cámara registrando el tiempo de espera y lo suelta al salir"""
+    start = time.perf_counter()
+    with lock:
+        lock_wait_seconds.observe(time.perf_counter() - start, microscope_id)
+        yield
+
+@app.route('/events', methods=['GET'])
+def events():
+    """Canal Server-Sent Events con los cambios de LED, ajustes, sensor, cámaras y sistema"""
+    subscription = event_bus.subscribe(request.headers.get('Last-Event-ID', type=int))
+    
+    def generate():
+        try:
+            yield b'retry: 2000\n\n'
+            while not subscription.closed:
+                pending = subscription.get(EVENT_KEEPALIVE)
+                if not pending:
+                    yield b': keepalive\n\n'
+                for event in pending:
+                    yield format_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+async def async_events(headers, match):
+    """Versión nativa de /events para el modo asíncrono"""
+    try:
+        last_event_id = int(headers['last-event-id'])
+    except (KeyError, ValueError):
+        last_event_id = None
+    subscription = event_bus.subscribe(last_event_id, loop=asyncio.get_running_loop())
+    
+    async def generate():
+        try:
+            yield b'retry: 2000\n\n'
+            while not subscription.closed:
+                pending = await subscription.get_async(EVENT_KEEPALIVE)
+                if not pending and not subscription.closed:
+                    yield b': keepalive\n\n'
+                for event in pending:
+                    yield format_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    headers = [('Content-Type', 'text/event-stream'), ('Cache-Control', 'no-cache'),
+               ('X-Accel-Buffering', 'no')]
+    return '200 OK', headers, generate()
+
+@app.route('/capture_all', methods=['GET'])
+def capture_all():
+    """Captura todos los microscopios casi simultáneamente y devuelve un ZIP"""
+    global IMAGE_FOLDER
+    
+    if not cameras:
+        return jsonify({'success': False, 'error': 'No hay microscopios conectados'}), 404
+    
+    try:
+        targets = sorted(cameras.items())
+        for mid, _ in targets:
+            get_grabber(mid)
+        
+        # grab() consecutivo en todas las cámaras con sus locks tomados, para que
+        # los hilos de captura no se intercalen entre ellos. retrieve() también
+        # se hace con los locks tomados: si se soltaran antes, el FrameGrabber
+        # haría un read() nuevo y se devolvería otro frame que el sincronizado.
+        with ExitStack() as stack:
+            for mid, data in targets:
+                stack.enter_context(acquire_camera_lock(mid, data['lock']))
+            capture_time = time.time()
+            # Las cámaras que aún no terminaron de abrirse cuentan como fallidas
+            captures = {mid: data['grabber'].capture for mid, data in targets}
+            grabbed = [mid for mid, cap in captures.items() if cap is not None and cap.grab()]
+            retrieved = {mid: capture_executor.submit(captures[mid].retrieve) for mid in grabbed}
+            frames = {mid: frame for mid, (ret, frame) in
+                      ((mid, future.result()) for mid, future in retrieved.items()) if ret}
+        
+        # Codificación en paralelo, ya sin los locks
+        futures = {mid: capture_executor.submit(encode_frame, frame, camera=mid)
+                   for mid, frame in frames.items()}
+        images = {mid: future.result() for mid, future in futures.items()}
+
+        timestamp = datetime.fromtimestamp(capture_time).strftime("%Y%m%d_%H%M%S")
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+            for mid, jpeg in images.items():
+                if jpeg is None:
+                    continue
+                filename = f"{mid}_{timestamp}.jpg"
+                zf.writestr(filename, jpeg)
+                image_writer.submit(os.path.join(IMAGE_FOLDER, filename), jpeg, mid)
+            zf.writestr('manifest.json', json.dumps({
+                'timestamp': capture_time,
+                'captured': [mid for mid, jpeg in images.items() if jpeg is not None],
+                'failed': [mid for mid, _ in targets if images.get(mid) is None]
+            }))
+        
+        response = Response(archive.getvalue(), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename=capture_all_{timestamp}.zip'
+        response.headers['X-Capture-Timestamp'] = f"{capture_time:.6f}"
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -159,9 +675,10 @@ def set_led():
     if microscope_id not in cameras:
         return jsonify({'success': False, 'error': 'Microscopio no encontrado'})
     
-    cameras[microscope_id]['config']['led_on'] = state
-    controller.led_state = state  # Para compatibilidad con el controlador original
-    controller.update_led()
+    try:
+        apply_led_changes([(microscope_id, state, None)])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     return jsonify({'success': True})
 
 @app.route('/set_intensity', methods=['POST'])
@@ -173,30 +690,90 @@ def set_intensity():
     if microscope_id not in cameras:
         return jsonify({'success': False, 'error': 'Microscopio no encontrado'})
     
-    cameras[microscope_id]['config']['led_intensity'] = intensity
-    controller.led_intensity = intensity  # Para compatibilidad con el controlador original
-    controller.update_led()
+    try:
+        apply_led_changes([(microscope_id, None, intensity)])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     return jsonify({'success': True})
 
+def apply_led_changes(changes):
+    """Aplica [(microscope_id, estado, intensidad)] al driver en una pasada y publica el resultado"""
+    results = led_driver.apply(changes)
+    for microscope_id, state, intensity in changes:
+        config = cameras[microscope_id]['config']
+        if state is not None:
+            config['led_on'] = state
+            controller.led_state = state  # Para compatibilidad con el controlador original
+        if intensity is not None:
+            config['led_intensity'] = intensity
+            controller.led_intensity = intensity
+    for microscope_id, result in results.items():
+        event_bus.publish('led', {'microscope_id': microscope_id, 'led_on': result['led_on'],
+                                  'led_intensity': result['led_intensity']})
+    return results
+
+@app.route('/set_leds', methods=['POST'])
+def set_leds():
+    """Cambios de estado e intensidad de varios microscopios en una sola petición"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('changes')
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'Se esperaba una lista changes'}), 400
+    
+    changes = []
+    for item in items:
+        microscope_id = item.get('microscope_id') if isinstance(item, dict) else None
+        if microscope_id not in cameras:
+            return jsonify({'success': False, 'error': f'Microscopio no encontrado: {microscope_id}'}), 404
+        changes.append((microscope_id, item.get('state'), item.get('intensity')))
+    
+    try:
+        results = apply_led_changes(changes)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'leds': results})
+
 @app.route('/set_interval', methods=['POST'])
 def set_interval():
     data = request.json
     controller.interval = data['interval']
     controller.save_config()
+    event_bus.publish('settings', {'interval': controller.interval})
     return jsonify({'success': True})
 
 @app.route('/get_data', methods=['GET'])
 def get_data():
-    sensor_data = controller.read_sensor()
+    sensor_data = sensor_sampler.latest()
     if sensor_data:
         return jsonify({
             'success': True,
             'temperature': sensor_data['temperature'],
             'humidity': sensor_data['humidity'],
-            'timestamp': sensor_data['timestamp']
+            'timestamp': sensor_data['timestamp'],
+            'age': round(sensor_data['age'], 3)  # segundos desde la lectura
         })
     return jsonify({'success': False})
 
+@app.route('/sensor_history', methods=['GET'])
+def sensor_history():
+    """Temperatura y humedad (mín/media/máx por intervalo) entre from y to (epoch)"""
+    end = request.args.get('to', time.time(), type=float)
+    start = request.args.get('from', end - 86400, type=float)
+    step = request.args.get('step', type=float)
+    if start >= end:
+        return jsonify({'success': False, 'error': 'Rango de tiempo no válido'}), 400
+    # Limitar el número de intervalos para que la respuesta siga siendo pequeña
+    min_step = (end - start) / SENSOR_HISTORY_MAX_BUCKETS
+    step = max(step or 0, min_step, 1.0)
+    
+    return jsonify({
+        'success': True,
+        'from': start,
+        'to': end,
+        'step': step,
+        'history': controller.sensor_store.aggregate(start, end, step)
+    })
+
 @app.route('/set_image_folder', methods=['POST'])
 def set_image_folder():
     global IMAGE_FOLDER  # Declaración global dentro de la función
@@ -212,6 +789,72 @@ def set_image_folder():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/writer_status', methods=['GET'])
+def writer_status():
+    """Métricas de la cola de escritura de capturas"""
+    return jsonify({'success': True, 'writer': image_writer.get_stats()})
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Aciertos, fallos y expulsiones de la caché de frames codificados"""
+    return jsonify({'success': True, 'cache': frame_cache.get_stats()})
+
+# Profundidades de cola y ocupación: se calculan solo al exponer /metrics
+registry.gauge('microscope_writer_queue_depth', 'Imágenes pendientes de escribir en disco',
+               callback=lambda: {(): image_writer.queue.qsize()})
+registry.gauge('microscope_stream_viewers', 'Espectadores de la transmisión MJPEG', ('camera',),
+               callback=lambda: {(mid,): data['streamer'].viewers for mid, data in list(cameras.items())})
+registry.gauge('microscope_frame_cache_bytes', 'Bytes ocupados por la caché de frames codificados',
+               callback=lambda: {(): frame_cache.get_stats()['bytes']})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(registry.expose(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/timelapse/start', methods=['POST'])
+def timelapse_start():
+    """Inicia un time-lapse sincronizado con el LED para un microscopio"""
+    data = request.json
+    microscope_id = data.get('microscope_id')
+    
+    if microscope_id not in cameras:
+        return jsonify({'success': False, 'error': 'Microscopio no encontrado'}), 404
+    
+    try:
+        max_captures = data.get('max_captures')
+        job = timelapse.start(
+            microscope_id,
+            interval=float(data['interval']),
+            settle=float(data.get('settle', 0.5)),
+            led_intensity=int(data.get('led_intensity', cameras[microscope_id]['config']['led_intensity'])),
+            max_captures=int(max_captures) if max_captures is not None else None
+        )
+        return jsonify({'success': True, 'status': job.get_status()})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/timelapse/stop', methods=['POST'])
+def timelapse_stop():
+    data = request.json
+    microscope_id = data.get('microscope_id')
+    if not timelapse.stop(microscope_id):
+        return jsonify({'success': False, 'error': 'No hay time-lapse activo'}), 404
+    return jsonify({'success': True})
+
+@app.route('/timelapse/status', methods=['GET'])
+def timelapse_status():
+    return jsonify({'success': True, 'jobs': timelapse.get_status()})
+
+@app.route('/hardware_status', methods=['GET'])
+def hardware_status():
+    """Backend de hardware en uso (y estado de PWM/DHT11 si es el simulador)"""
+    return jsonify({
+        'success': True,
+        'hardware': controller.hardware.describe(),
+        'leds': led_driver.get_state()
+    })
+
 @app.route('/get_camera_status', methods=['GET'])
 def get_camera_status():
     status = {
@@ -221,9 +864,39 @@ def get_camera_status():
     }
     return jsonify({'success': True, 'status': status})
 
+def shutdown():
+    """Libera cámaras, escritura pendiente y GPIO antes de salir"""
+    event_bus.close()
+    timelapse.stop_all()
+    camera_watcher.stop()
+    for data in list(cameras.values()):
+        data['streamer'].stop()
+        data['grabber'].release()
+    image_writer.stop()
+    capture_executor.shutdown(wait=False)
+    led_driver.stop()
+    system_stats.stop()
+    sensor_sampler.stop()
+    controller.stop()
+    print("Servidor detenido")
+
 if __name__ == '__main__':
     print(f"Microscopios detectados: {len(cameras)}")
-    for mid, data in cameras.items():
+    for mid, data in list(cameras.items()):
         print(f"- {mid}: {data['device']}")
     
-    app.run(host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
+    host = os.environ.get('SERVER_HOST', '0.0.0.0')
+    port = int(os.environ.get('SERVER_PORT', 5000))
+    # dev: servidor de desarrollo de Flask; async: uvicorn para producción
+    if os.environ.get('SERVER_MODE', 'dev') == 'async':
+        AsyncServer(app, host, port,
+                    max_connections=int(os.environ.get('MAX_CONNECTIONS', 512)),
+                    workers=int(os.environ.get('SERVER_WORKERS', 8)),
+                    async_routes=[(re.compile(r'/stream/([^/]+)'), '/stream/<microscope_id>', async_stream),
+                                  (re.compile(r'/events'), '/events', async_events)],
+                    on_shutdown=shutdown).run()
+    else:
+        try:
+            app.run(host=host, port=port, threaded=True)
+        finally:
+            shutdown()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import time
+import numpy as np
+from threading import Thread, Event, Lock
+
+# Columnas del buffer circular
+FIELDS = ('time', 'cpu', 'ram', 'storage', 'temp')
+
+
+class SystemStatsSampler:
+    """Muestrea las estadísticas del sistema a ritmo fijo en un buffer circular numérico.
+
+    Los endpoints leen la última muestra en O(1), de modo que el coste de
+    monitorizar no crece con el número de clientes que sondean.
+    """
+
+    def __init__(self, sample, interval=1.0, capacity=3600, on_sample=None):
+        self.sample = sample  # función que devuelve {'cpu', 'ram', 'storage', 'temp'}
+        self.on_sample = on_sample  # recibe cada muestra nueva
+        self.interval = interval
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, len(FIELDS)), dtype=np.float64)
+        self.count = 0  # muestras escritas en total
+        self.lock = Lock()
+        self.stop_event = Event()
+
+        self.record()
+        self.thread = Thread(target=self.run_loop, name='system-stats', daemon=True)
+        self.thread.start()
+
+    def record(self):
+        try:
+            stats = self.sample()
+        except Exception as e:
+            print(f"Error muestreando estadísticas del sistema: {e}")
+            return
+        row = (time.time(),) + tuple(float(stats[name]) for name in FIELDS[1:])
+        with self.lock:
+            self.buffer[self.count % self.capacity] = row
+            self.count += 1
+        if self.on_sample:
+            try:
+                self.on_sample(dict(zip(FIELDS, row)))
+            except Exception as e:
+                print(f"Error publicando estadísticas del sistema: {e}")
+
+    def run_loop(self):
+        # Ritmo fijo sin deriva, aunque una muestra tarde más de lo normal
+        next_time = time.monotonic()
+        while True:
+            next_time += self.interval
+            if self.stop_event.wait(max(0.0, next_time - time.monotonic())):
+                break
+            self.record()
+
+    def latest(self):
+        """Última muestra como diccionario, o None si aún no hay ninguna"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            row = self.buffer[(self.count - 1) % self.capacity].copy()
+        return dict(zip(FIELDS, row.tolist()))
+
+    def history(self, since=None, max_points=300):
+        """Serie temporal desde `since` (epoch), promediada en como mucho max_points puntos"""
+        with self.lock:
+            size = min(self.count, self.capacity)
+            start = self.count - size
+            # Orden cronológico: de la muestra más antigua a la más reciente
+            indices = np.arange(start, self.count) % self.capacity
+            rows = self.buffer[indices].copy()
+
+        if since is not None:
+            rows = rows[rows[:, 0] > since]
+        if max_points and len(rows) > max_points:
+            # Promedia bloques contiguos; el último bloque puede ser más corto
+            step = -(-len(rows) // max_points)
+            edges = np.arange(0, len(rows), step)
+            sums = np.add.reduceat(rows, edges, axis=0)
+            counts = np.diff(np.append(edges, len(rows)))[:, None]
+            rows = sums / counts
+
+        return {name: rows[:, i].round(2).tolist() for i, name in enumerate(FIELDS)}
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=2.0)
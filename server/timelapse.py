@@ -0,0 +1,160 @@
+import time
+from threading import Thread, Event, Lock, current_thread
+
+
+class TimelapseJob:
+    """Capturas periódicas de un microscopio con el LED encendido solo durante la toma"""
+
+    def __init__(self, microscope_id, interval, settle, led_intensity, max_captures,
+                 set_led, grab_frame, persist_frame):
+        self.microscope_id = microscope_id
+        self.interval = interval
+        self.settle = settle
+        self.led_intensity = led_intensity
+        self.max_captures = max_captures  # None = sin límite
+
+        # Funciones provistas por el servidor
+        self.set_led = set_led
+        self.grab_frame = grab_frame
+        self.persist_frame = persist_frame
+
+        self.captures = 0
+        self.failures = 0
+        self.skipped = 0
+        self.led_on_seconds = 0.0
+        self.last_capture = None
+        self.next_capture = None
+        self.started = None
+
+        self.stop_event = Event()
+        self.thread = Thread(target=self.run_loop, name=f"timelapse-{microscope_id}", daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread.start()
+
+    def run_loop(self):
+        """Planificación sin deriva: la toma k ocurre en inicio + k * intervalo"""
+        slot = 0
+        while not self.stop_event.is_set():
+            self.next_capture = self.started + slot * self.interval
+            delay = self.next_capture - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+
+            try:
+                self.capture_once()
+            except Exception as e:
+                # Una toma fallida no debe terminar el trabajo
+                self.failures += 1
+                print(f"Time-lapse {self.microscope_id}: error en la toma: {e}")
+            if self.max_captures is not None and self.captures >= self.max_captures:
+                break
+
+            # Si una toma se retrasa más de un intervalo, saltar los huecos perdidos
+            slot += 1
+            behind = int((time.monotonic() - self.started) // self.interval) - slot + 1
+            if behind > 0:
+                self.skipped += behind
+                slot += behind
+        self.next_capture = None
+
+    def capture_once(self):
+        """Enciende el LED, espera la estabilización, captura y apaga"""
+        led_start = time.monotonic()
+        try:
+            # Dentro del try: si falla el encendido, el finally restaura el LED
+            self.set_led(self.microscope_id, True, self.led_intensity)
+            if self.settle > 0:
+                self.stop_event.wait(self.settle)
+            # Frame expuesto después de la estabilización
+            latest = self.grab_frame(self.microscope_id)
+        finally:
+            self.set_led(self.microscope_id, False, self.led_intensity)
+            self.led_on_seconds += time.monotonic() - led_start
+
+        if latest is None:
+            self.failures += 1
+            print(f"Time-lapse {self.microscope_id}: no se pudo capturar")
+            return
+
+        _, frame_time, frame = latest
+        try:
+            self.persist_frame(self.microscope_id, frame_time, frame)
+            self.captures += 1
+            self.last_capture = frame_time
+        except Exception as e:
+            self.failures += 1
+            print(f"Time-lapse {self.microscope_id}: error al guardar: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive() and self.thread is not current_thread():
+            self.thread.join(timeout=5.0)
+
+    def get_status(self):
+        now = time.monotonic()
+        elapsed = now - self.started if self.started else 0.0
+        return {
+            'running': self.thread.is_alive(),
+            'interval': self.interval,
+            'settle': self.settle,
+            'led_intensity': self.led_intensity,
+            'max_captures': self.max_captures,
+            'captures': self.captures,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'last_capture': self.last_capture,
+            'next_capture_in': max(0.0, self.next_capture - now) if self.next_capture else None,
+            'led_duty_cycle': self.led_on_seconds / elapsed if elapsed > 0 else 0.0
+        }
+
+
+class TimelapseEngine:
+    """Gestiona un trabajo de time-lapse por microscopio"""
+
+    def __init__(self, set_led, grab_frame, persist_frame):
+        self.set_led = set_led
+        self.grab_frame = grab_frame
+        self.persist_frame = persist_frame
+        self.jobs = {}
+        self.lock = Lock()
+
+    def start(self, microscope_id, interval, settle=0.5, led_intensity=100, max_captures=None):
+        """Inicia (o reinicia) el time-lapse de un microscopio"""
+        if interval <= 0:
+            raise ValueError("El intervalo debe ser mayor que 0")
+        if settle < 0 or settle >= interval:
+            raise ValueError("La estabilización debe ser menor que el intervalo")
+        if not 0 <= led_intensity <= 100:
+            raise ValueError("La intensidad del LED debe estar entre 0 y 100")
+
+        job = TimelapseJob(microscope_id, interval, settle, led_intensity, max_captures,
+                           self.set_led, self.grab_frame, self.persist_frame)
+        with self.lock:
+            previous = self.jobs.pop(microscope_id, None)
+            self.jobs[microscope_id] = job
+        if previous:
+            previous.stop()
+        job.start()
+        return job
+
+    def stop(self, microscope_id):
+        """Detiene el time-lapse de un microscopio; devuelve False si no existía"""
+        with self.lock:
+            job = self.jobs.pop(microscope_id, None)
+        if job is None:
+            return False
+        job.stop()
+        return True
+
+    def stop_all(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+            self.jobs.clear()
+        for job in jobs:
+            job.stop()
+
+    def get_status(self):
+        with self.lock:
+            return {mid: job.get_status() for mid, job in self.jobs.items()}
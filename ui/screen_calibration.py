@@ -9,6 +9,7 @@ matplotlib.use('Agg')  # Configurar el backend para evitar problemas
 import matplotlib.pyplot as plt
 from io import BytesIO
 import cv2
+from controllers.event_subscriber import FALLBACK_POLL_MS
 
 class HistogramWindow(QDialog):
     def __init__(self, parent=None):
@@ -177,6 +178,8 @@ class HistogramWindow(QDialog):
             else:
                 self.image_data = image_data
             
+            self.hist = np.histogram(self.image_data, bins=256, range=(0, 256))[0]
+            
             # Calcular estadísticas
             self.calculate_stats()
             
@@ -202,7 +205,29 @@ class HistogramWindow(QDialog):
         vals, counts = np.unique(self.image_data, return_counts=True)
         self.mode_val = vals[np.argmax(counts)]
         
-        # Actualizar la interfaz
+        self.update_stats_labels()
+    
+    def display_histogram_data(self, histogram, stats):
+        """Muestra un histograma ya calculado en el servidor (256 bins + estadísticas)"""
+        try:
+            self.hist = np.asarray(histogram, dtype=np.int64)
+            self.min_val = stats['min']
+            self.max_val = stats['max']
+            self.mean_val = stats['mean']
+            self.median_val = stats['median']
+            self.std_val = stats['std']
+            self.mode_val = stats['mode']
+            
+            self.update_stats_labels()
+            self.generate_histogram()
+            self.show()
+            
+        except Exception as e:
+            print(f"Error al mostrar histograma: {str(e)}")
+            QMessageBox.critical(self, "Error", f"No se pudo generar el histograma:\n{str(e)}")
+    
+    def update_stats_labels(self):
+        """Actualiza las etiquetas de estadísticas"""
         stats = [self.min_val, self.max_val, self.mean_val, 
                 self.median_val, self.std_val, self.mode_val]
         
@@ -218,7 +243,8 @@ class HistogramWindow(QDialog):
         ax = self.figure.add_subplot(111)
         
         # Datos del histograma
-        hist, bins = np.histogram(self.image_data, bins=256, range=(0, 256))
+        hist = self.hist
+        bins = np.arange(257)
         
         # Gráfico de barras con estilo mejorado
         bars = ax.bar(bins[:-1], hist, width=1, 
@@ -294,7 +320,8 @@ class HistogramWindow(QDialog):
         
         if file_path:
             try:
-                hist, bins = np.histogram(self.image_data, bins=256, range=(0, 256))
+                hist = self.hist
+                bins = np.arange(257)
                 
                 if not file_path.lower().endswith('.csv'):
                     file_path += '.csv'
@@ -316,7 +343,12 @@ class CalibrationScreen(QWidget):
         self.current_microscope = None
         self.init_ui()
         self.setup_sensor_timer()
-    
+        
+        # Confirmaciones del envío agrupado de ajustes
+        commands = self.parent.api_client.get_command_channel()
+        commands.command_acknowledged.connect(self.on_command_acknowledged)
+        commands.command_failed.connect(self.on_command_failed)
+
     def init_ui(self):
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(25, 25, 25, 25)
@@ -537,6 +569,21 @@ class CalibrationScreen(QWidget):
         self.sensor_timer = QTimer(self)
         self.sensor_timer.timeout.connect(self.update_sensor_data)
         self.sensor_timer.start(5000)  # Actualizar cada 5 segundos
+        
+        # Con eventos del servidor se actualiza con cada lectura y el temporizador queda de respaldo
+        events = self.parent.api_client.events
+        if events is not None:
+            events.sensor_updated.connect(self.on_sensor_event)
+            events.connection_changed.connect(self.on_events_connection)
+            self.on_events_connection(events.connected)
+    
+    def on_sensor_event(self, data):
+        # La lectura llega en el evento: no hace falta consultar al servidor
+        if self.current_microscope:
+            self.show_sensor_data(data)
+    
+    def on_events_connection(self, connected):
+        self.sensor_timer.setInterval(FALLBACK_POLL_MS if connected else 5000)
     
     def update_sensor_data(self):
         """Actualiza los datos del sensor con colores condicionales"""
@@ -545,19 +592,22 @@ class CalibrationScreen(QWidget):
             
         sensor_data = self.parent.api_client.get_data()
         if sensor_data:
-            # Temperatura con color condicional
-            temp = sensor_data.get('temperature', '--')
-            temp_color = "#e74c3c" if isinstance(temp, (int, float)) and temp > 30 else "#3498db"
-            self.temperature_label.setText(f"🌡️ Temperatura: {temp}°C")
-            self.temperature_label.setStyleSheet(f"font-size: 14px; color: {temp_color};")
-            
-            # Humedad
-            humidity = sensor_data.get('humidity', '--')
-            self.humidity_label.setText(f"💧 Humedad: {humidity}%")
-            
-            # Timestamp
-            if 'timestamp' in sensor_data:
-                self.timestamp_label.setText(f"⏱️ Última captura: {sensor_data['timestamp']}")
+            self.show_sensor_data(sensor_data)
+    
+    def show_sensor_data(self, sensor_data):
+        # Temperatura con color condicional
+        temp = sensor_data.get('temperature', '--')
+        temp_color = "#e74c3c" if isinstance(temp, (int, float)) and temp > 30 else "#3498db"
+        self.temperature_label.setText(f"🌡️ Temperatura: {temp}°C")
+        self.temperature_label.setStyleSheet(f"font-size: 14px; color: {temp_color};")
+        
+        # Humedad
+        humidity = sensor_data.get('humidity', '--')
+        self.humidity_label.setText(f"💧 Humedad: {humidity}%")
+        
+        # Timestamp
+        if 'timestamp' in sensor_data:
+            self.timestamp_label.setText(f"⏱️ Última captura: {sensor_data['timestamp']}")
     
     def set_microscope(self, microscope_id):
         self.current_microscope = microscope_id
@@ -588,16 +638,18 @@ class CalibrationScreen(QWidget):
     def toggle_led(self):
         if not self.current_microscope:
             return
-            
+        
         current_text = self.led_toggle.text()
         new_state = "🔴 Apagar LED" not in current_text
         
-        success = self.parent.api_client.set_led_state(
-            self.current_microscope, 
-            new_state
-        )
-        
-        if success:
+        # El botón se actualiza cuando el servidor confirma el cambio (on_command_acknowledged)
+        self.parent.api_client.send_command(self.current_microscope, 'led_state', new_state)
+    
+    def on_command_acknowledged(self, microscope_id, setting, value):
+        if microscope_id != self.current_microscope:
+            return
+        if setting == 'led_state':
+            new_state = value
             self.led_toggle.setText("🔴 Apagar LED" if new_state else "🟢 Encender LED")
             self.led_toggle.setStyleSheet(f"""
                 QPushButton {{
@@ -610,40 +662,41 @@ class CalibrationScreen(QWidget):
                 }}
             """)
     
+    def on_command_failed(self, microscope_id, setting, value):
+        print(f"Error al aplicar {setting}={value} en {microscope_id}")
+        if microscope_id == self.current_microscope and setting == 'led_intensity':
+            # Volver al valor que tiene realmente el servidor
+            self.parent.api_client.invalidate_state()
+            config = self.parent.api_client.get_microscope_config(microscope_id)
+            if config:
+                self.intensity_slider.blockSignals(True)
+                self.intensity_slider.setValue(config.get('led_intensity', 50))
+                self.intensity_slider.blockSignals(False)
+    
     def update_led_intensity(self, value):
         if not self.current_microscope:
             return
-            
-        self.parent.api_client.set_led_intensity(
-            self.current_microscope,
-            value
-        )
+        
+        # Sin bloquear la interfaz: durante un arrastre solo se envían unos pocos valores
+        self.parent.api_client.send_command(self.current_microscope, 'led_intensity', value)
     
     def generate_histogram(self):
         if not self.current_microscope:
             return
             
-        # Obtener imagen real del microscopio (reemplazar esta parte con tu implementación)
+        # El servidor calcula los histogramas y estadísticas (pocos KB de JSON)
         try:
-            # Esto es solo un ejemplo - reemplazar con tu código real de captura
-            image_data = self.parent.api_client.capture_image(self.current_microscope)
-            if image_data is None:
-                print("Error: No se pudo obtener imagen del microscopio")
+            data = self.parent.api_client.get_histogram(self.current_microscope)
+            if data is None:
+                print("Error: No se pudo obtener el histograma del microscopio")
                 return
-                
-            # Convertir a numpy array (asegúrate que esta parte coincida con tu implementación)
-            if isinstance(image_data, np.ndarray):
-                img_array = image_data
-            else:
-                # Ejemplo de conversión para datos binarios
-                img_array = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
-                if img_array is None:
-                    print("Error: No se pudo decodificar la imagen")
-                    return
             
             # Crear y mostrar la ventana del histograma
             histogram_window = HistogramWindow(self)
-            histogram_window.display_histogram(img_array)
+            histogram_window.display_histogram_data(
+                data['histograms']['luminance'],
+                data['stats']['luminance']
+            )
             histogram_window.exec()
             
         except Exception as e:
@@ -2,8 +2,10 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                             QPushButton, QTabWidget, QGroupBox, QGridLayout,
                             QFrame)
 from PyQt6.QtCore import pyqtSignal, QTimer, Qt  # Asegúrate de tener Qt aquí
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QPixmap
 from controllers.microscope_thread import MicroscopeThread
+from controllers.stream_thread import StreamThread
+from controllers.event_subscriber import FALLBACK_POLL_MS
 
 class MicroscopesScreen(QWidget):
     calibration_signal = pyqtSignal(str)  # Emite ID del microscopio
@@ -91,8 +93,9 @@ class MicroscopesScreen(QWidget):
                 color: white;
             }
         """)
+        self.tab_widget.currentChanged.connect(self.update_streams)
         main_layout.addWidget(self.tab_widget, stretch=4)
-        
+
         # Panel lateral del sistema (20% ancho)
         self.system_group = QGroupBox("Estado del Sistema (RPi 3B)")
         self.system_group.setStyleSheet("""
@@ -150,16 +153,39 @@ class MicroscopesScreen(QWidget):
         self.system_timer.timeout.connect(self.update_system_status)
         self.system_timer.start(3000)  # Actualizar cada 3 segundos
         self.update_system_status()  # Primera actualización
+        
+        # Con eventos del servidor se actualiza al recibirlos y el temporizador queda de respaldo
+        events = self.parent.api_client.events
+        if events is not None:
+            events.system_updated.connect(self.on_system_event)
+            events.camera_changed.connect(self.on_camera_event)
+            events.connection_changed.connect(self.on_events_connection)
+            self.on_events_connection(events.connected)
+    
+    def on_system_event(self, stats):
+        # Las estadísticas llegan en el evento: no hace falta consultar al servidor
+        self.show_system_status(stats)
+    
+    def on_camera_event(self, microscope_id, connected):
+        if not connected:
+            self.remove_microscope_tab(microscope_id)
+        self.refresh_data()
+
+    def on_events_connection(self, connected):
+        self.system_timer.setInterval(FALLBACK_POLL_MS if connected else 3000)
     
     def update_system_status(self):
         """Actualiza los datos del sistema Raspberry Pi"""
         status = self.parent.api_client.get_system_status()
         if status:
-            self.cpu_label.setText(f"CPU: {status.get('cpu_usage', '--')}%")
-            self.mem_label.setText(f"Memoria: {status.get('memory_usage', '--')}%")
-            self.temp_label.setText(f"Temp CPU: {status.get('cpu_temp', '--')}°C")
-            self.disk_label.setText(f"Disco: {status.get('disk_usage', '--')}%")
-            self.uptime_label.setText(f"Tiempo activo: {status.get('uptime', '--')}")
+            self.show_system_status(status)
+    
+    def show_system_status(self, status):
+        self.cpu_label.setText(f"CPU: {status.get('cpu_usage', '--')}%")
+        self.mem_label.setText(f"Memoria: {status.get('memory_usage', '--')}%")
+        self.temp_label.setText(f"Temp CPU: {status.get('cpu_temp', '--')}°C")
+        self.disk_label.setText(f"Disco: {status.get('disk_usage', '--')}%")
+        self.uptime_label.setText(f"Tiempo activo: {status.get('uptime', '--')}")
     
     def load_data(self, microscopes):
         """Carga los microscopios disponibles"""
@@ -258,7 +284,8 @@ class MicroscopesScreen(QWidget):
             'led_button': led_button,
             'temp_label': temp_label,
             'video_label': video_label,
-            'video_frame': video_frame
+            'video_frame': video_frame,
+            'stream_thread': None  # solo mientras la pestaña está visible
         }
         
         # Crear y guardar hilo para este microscopio
@@ -269,8 +296,61 @@ class MicroscopesScreen(QWidget):
         # Guardar el hilo en el diccionario
         self.microscopes[microscope_id]['thread'] = thread
         
+        # Transmisión en vivo (MJPEG) de la pestaña visible
+        self.update_streams()
+        
+        self.update_microscope_count()
+    
+    def remove_microscope_tab(self, microscope_id):
+        """Quita la pestaña de un microscopio desconectado y detiene sus hilos"""
+        controls = self.microscopes.pop(microscope_id, None)
+        if controls is None:
+            return
+        self.stop_microscope_threads(controls)
+        index = self.tab_widget.indexOf(controls['tab'])
+        if index != -1:
+            self.tab_widget.removeTab(index)
+        controls['tab'].deleteLater()
         self.update_microscope_count()
     
+    def stop_microscope_threads(self, controls):
+        thread = controls['thread']
+        if self.parent.api_client.events is not None:
+            self.parent.api_client.events.led_changed.disconnect(thread.on_led_changed)
+        thread.stop()
+        if controls['stream_thread'] is not None:
+            controls['stream_thread'].stop()
+            controls['stream_thread'] = None
+    
+    def update_streams(self, *args):
+        """Transmite solo el microscopio de la pestaña visible (si la pantalla se ve)"""
+        current = self.tab_widget.currentWidget()
+        for microscope_id, controls in self.microscopes.items():
+            visible = self.isVisible() and controls['tab'] is current
+            stream_thread = controls['stream_thread']
+            if visible and stream_thread is None:
+                stream_thread = StreamThread(microscope_id, self.parent.api_client)
+                stream_thread.frame_received.connect(
+                    lambda data, mid=microscope_id: self.update_video_frame(mid, data))
+                stream_thread.start()
+                controls['stream_thread'] = stream_thread
+            elif not visible and stream_thread is not None:
+                stream_thread.stop()
+                controls['stream_thread'] = None
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_streams()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_streams()
+    
+    def stop_threads(self):
+        """Detiene los hilos de todos los microscopios (al cerrar la aplicación)"""
+        for controls in self.microscopes.values():
+            self.stop_microscope_threads(controls)
+
     def update_microscope_status(self, microscope_id, status):
         """Actualiza la UI con el estado del microscopio"""
         if microscope_id in self.microscopes:
@@ -294,6 +374,18 @@ class MicroscopesScreen(QWidget):
                 temp = status.get('temperature', '--')
                 controls['temp_label'].setText(f"🌡️ Temperatura: {temp}°C")
     
+    def update_video_frame(self, microscope_id, data):
+        """Muestra el último frame recibido de la transmisión en vivo"""
+        if microscope_id in self.microscopes:
+            video_label = self.microscopes[microscope_id]['video_label']
+            pixmap = QPixmap()
+            if pixmap.loadFromData(data, 'JPG'):
+                video_label.setPixmap(pixmap.scaled(
+                    video_label.size(),
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation
+                ))
+    
     def update_microscope_count(self):
         """Actualiza el contador de microscopios con estilo"""
         count = self.tab_widget.count()
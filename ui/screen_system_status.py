@@ -2,6 +2,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton,
                             QProgressBar, QHBoxLayout, QGroupBox, QFrame)
 from PyQt6.QtCore import pyqtSignal, QTimer, Qt
 from PyQt6.QtGui import QFont, QPixmap, QIcon
+from controllers.event_subscriber import FALLBACK_POLL_MS
 
 class SystemStatusScreen(QWidget):
     next_screen_signal = pyqtSignal()
@@ -188,41 +189,63 @@ class SystemStatusScreen(QWidget):
         self.update_timer.timeout.connect(self.update_status)
         self.update_timer.start(2000)  # Actualizar cada 2 segundos
         self.update_status()  # Llamada inicial
+        
+        # Con eventos del servidor se actualiza al recibirlos y el temporizador queda de respaldo
+        events = self.parent.api_client.events
+        if events is not None:
+            events.system_updated.connect(self.on_system_event)
+            events.camera_changed.connect(self.on_camera_event)
+            events.connection_changed.connect(self.on_events_connection)
+            self.on_events_connection(events.connected)
+    
+    def on_system_event(self, stats):
+        # Las estadísticas llegan en el evento: no hace falta consultar al servidor
+        self.show_system_resources(stats)
+    
+    def on_camera_event(self, microscope_id, connected):
+        self.show_microscopes(self.parent.api_client.get_microscopes())
+    
+    def on_events_connection(self, connected):
+        self.update_timer.setInterval(FALLBACK_POLL_MS if connected else 2000)
     
     def update_status(self):
         """Actualiza los datos del sistema"""
         status = self.parent.api_client.get_system_status()
         if status:
-            # Actualizar recursos del sistema
-            for resource in ['cpu_usage', 'memory_usage', 'storage_usage']:
-                value = int(status.get(resource, 0))
-                getattr(self, f"{resource}_label").setText(
-                    f"{resource.replace('_', ' ').title()}: {value}%"
-                )
-                getattr(self, f"{resource}_bar").setValue(value)
-            
-            # Actualizar temperatura
-            cpu_temp = status.get('cpu_temp', '--')
-            self.temp_label.setText(f"Temperatura CPU: {cpu_temp}°C")
-            
-            # Cambiar color de temperatura si es alta
-            if isinstance(cpu_temp, (int, float)):
-                color = "#e74c3c" if cpu_temp > 70 else "#2ecc71" if cpu_temp > 50 else "#3498db"
-                self.temp_label.setStyleSheet(f"font-size: 14px; color: {color};")
-            
-            # Actualizar información de microscopios
-            microscopes = self.parent.api_client.get_microscopes()
-            count = len(microscopes)
+            self.show_system_resources(status)
+            self.show_microscopes(self.parent.api_client.get_microscopes())
+    
+    def show_system_resources(self, status):
+        # Actualizar recursos del sistema
+        for resource in ['cpu_usage', 'memory_usage', 'storage_usage']:
+            value = int(status.get(resource, 0))
+            getattr(self, f"{resource}_label").setText(
+                f"{resource.replace('_', ' ').title()}: {value}%"
+            )
+            getattr(self, f"{resource}_bar").setValue(value)
+        
+        # Actualizar temperatura
+        cpu_temp = status.get('cpu_temp', '--')
+        self.temp_label.setText(f"Temperatura CPU: {cpu_temp}°C")
+        
+        # Cambiar color de temperatura si es alta
+        if isinstance(cpu_temp, (int, float)):
+            color = "#e74c3c" if cpu_temp > 70 else "#2ecc71" if cpu_temp > 50 else "#3498db"
+            self.temp_label.setStyleSheet(f"font-size: 14px; color: {color};")
             
-            if count > 0:
-                self.microscope_count_label.setText(f"🟢 {count} microscopio(s) detectado(s)")
-                self.microscope_list_label.setText(
-                    "Dispositivos conectados:\n" + "\n".join(
-                        f"• {microscope_id}" for microscope_id in microscopes
-                    )
+    def show_microscopes(self, microscopes):
+        # Actualizar información de microscopios
+        count = len(microscopes)
+        
+        if count > 0:
+            self.microscope_count_label.setText(f"🟢 {count} microscopio(s) detectado(s)")
+            self.microscope_list_label.setText(
+                "Dispositivos conectados:\n" + "\n".join(
+                    f"• {microscope_id}" for microscope_id in microscopes
                 )
-                self.next_button.setEnabled(True)
-            else:
-                self.microscope_count_label.setText("🔴 No se detectaron microscopios")
-                self.microscope_list_label.setText("Conecte al menos un microscopio USB")
-                self.next_button.setEnabled(False)
\ No newline at end of file
+            )
+            self.next_button.setEnabled(True)
+        else:
+            self.microscope_count_label.setText("🔴 No se detectaron microscopios")
+            self.microscope_list_label.setText("Conecte al menos un microscopio USB")
+            self.next_button.setEnabled(False)
\ No newline at end of file